@@ -0,0 +1,128 @@
+"""Load test: superseded background callbacks do not queue up.
+
+Fires a burst of heatmap updates, each for a slightly different time window,
+the way a client does while the slider value keeps changing, and samples how
+many background jobs are alive after every request. With cancellation each
+request terminates the job it supersedes (the ``oldJob`` the Dash renderer
+sends), so at most one job runs; without it every stale job runs to the end.
+The run fails if cancellation is on and more than one job was alive.
+
+Run from ``src/``:
+
+    python -m benchmarks.background_queueing --data-path data/processed_data.csv
+    python -m benchmarks.background_queueing --no-cancel
+"""
+
+import argparse
+import sys
+import time
+
+import psutil
+
+from msviz.visualization import create_app
+
+
+def _body(service_name: str, window: list) -> dict:
+    return {
+        "output": "heatmap-graph.figure",
+        "outputs": {"id": "heatmap-graph", "property": "figure"},
+        "inputs": [
+            {"id": "service-name-dropdown", "property": "value", "value": service_name},
+            {"id": "time-range-slider", "property": "value", "value": window},
+        ],
+        "changedPropIds": ["time-range-slider.value"],
+        "state": [],
+    }
+
+
+def _alive(jobs: list) -> int:
+    alive = 0
+    for job in jobs:
+        try:
+            if psutil.Process(job).status() != psutil.STATUS_ZOMBIE:
+                alive += 1
+        except psutil.NoSuchProcess:
+            pass
+    return alive
+
+
+def run(data_path: str, backend: str, requests: int, interval: float, cancel: bool):
+    app = create_app(data_path, backend, background_callbacks=True)
+    client = app.server.test_client()
+    layout = client.get("/_dash-layout").get_json()
+    slider = _find(layout, "time-range-slider")
+    service_name = _find(layout, "service-name-dropdown")["value"]
+    low, high = slider["value"]
+
+    jobs = []
+    peak = 0
+    started = time.perf_counter()
+    for index in range(requests):
+        # A distinct window per request, so no result is served from cache.
+        window = [low, max(low, high - index)]
+        query = {"oldJob": jobs[-1]} if cancel and jobs else {}
+        response = client.post(
+            "/_dash-update-component",
+            json=_body(service_name, window),
+            query_string=query,
+        ).get_json()
+        jobs.append(response["job"])
+        cache_key = response["cacheKey"]
+        peak = max(peak, _alive(jobs))
+        time.sleep(interval)
+
+    # Wait for the last, current request to deliver its figure.
+    while True:
+        response = client.post(
+            "/_dash-update-component",
+            json=_body(service_name, window),
+            query_string={"cacheKey": cache_key, "job": jobs[-1]},
+        )
+        if response.status_code == 200 and b"response" in response.data:
+            break
+        peak = max(peak, _alive(jobs))
+        time.sleep(interval)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{requests} requests, cancellation {'on' if cancel else 'off'}: "
+        f"peak {peak} background jobs alive, last figure after {elapsed:.2f}s"
+    )
+    return peak
+
+
+def _find(node, component_id):
+    if isinstance(node, dict):
+        props = node.get("props", {})
+        if props.get("id") == component_id:
+            return props
+        node = list(props.values())
+    if isinstance(node, list):
+        for child in node:
+            found = _find(child, component_id)
+            if found is not None:
+                return found
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-path", default="data/processed_data.csv")
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument(
+        "--interval", type=float, default=0.05, help="Seconds between requests"
+    )
+    parser.add_argument(
+        "--no-cancel",
+        dest="cancel",
+        action="store_false",
+        help="Do not terminate superseded jobs, to compare against",
+    )
+    args = parser.parse_args()
+    peak = run(args.data_path, args.backend, args.requests, args.interval, args.cancel)
+    if args.cancel and peak > 1:
+        sys.exit(f"Superseded jobs were not cancelled: {peak} ran at once")
+
+
+if __name__ == "__main__":
+    main()
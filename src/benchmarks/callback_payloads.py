@@ -0,0 +1,194 @@
+"""Benchmark: bytes over the wire and server time per callback.
+
+Requests the page layout and the main views for the default selection with
+the Flask test client, once without compression and once with
+``Accept-Encoding: br, gzip`` the way a browser sends it, and prints the raw
+and encoded response sizes, the encoding and the time per request: the first,
+uncompressed request computes the view, and the compressed ones that follow
+may be served from the query plan's cache, so both times are shown.
+The edge views (histogram and violin plot) are opened for the busiest edge of
+the selected trace, as if it had been clicked.
+
+Run from ``src/``:
+
+    python -m benchmarks.callback_payloads --data-path data/processed_data.csv
+    python -m benchmarks.callback_payloads --trace-id t17-0 --repeat 5
+"""
+
+import argparse
+import statistics
+import time
+from collections import Counter
+
+from msviz.visualization import create_app
+
+ACCEPT_ENCODING = "br, gzip"
+
+
+def _body(outputs: list, inputs: dict, state: dict | None = None) -> dict:
+    def props(values):
+        return [
+            dict(zip(("id", "property"), key.split(".")), value=value)
+            for key, value in values.items()
+        ]
+
+    targets = [dict(zip(("id", "property"), output.split("."))) for output in outputs]
+    multiple = len(outputs) > 1
+    return {
+        "output": f"..{'...'.join(outputs)}.." if multiple else outputs[0],
+        "outputs": targets if multiple else targets[0],
+        "inputs": props(inputs),
+        "state": props(state or {}),
+        "changedPropIds": [next(iter(inputs))],
+    }
+
+
+def _trace_view(trace_id: str, window: list) -> dict:
+    return _body(
+        [
+            "cytoscape-graph.elements",
+            "cytoscape-graph.stylesheet",
+            "event-table.children",
+            "latency-attribution-table.children",
+        ],
+        {"trace-id-dropdown.value": trace_id, "time-range-slider.value": window},
+    )
+
+
+def _busiest_edge(client, trace_id: str, window: list) -> dict | None:
+    response = client.post(
+        "/_dash-update-component", json=_trace_view(trace_id, window)
+    )
+    elements = response.get_json()["response"]["cytoscape-graph"]["elements"]
+    counts = Counter(
+        (element["data"]["source"], element["data"]["target"])
+        for element in elements
+        if "source" in element["data"]
+    )
+    if not counts:
+        return None
+    (source, target), _ = counts.most_common(1)[0]
+    return {"source": source, "target": target}
+
+
+def _views(layout: dict, trace_id: str, edge: dict | None) -> dict:
+    window = _find(layout, "time-range-slider")["value"]
+    service = _find(layout, "service-name-dropdown")["value"]
+    views = {
+        "trace view": _trace_view(trace_id, window),
+        "overall graph": _body(
+            ["overall-cytoscape-graph.elements", "overall-graph-sync.data"],
+            {"trace-id-dropdown.value": trace_id, "time-range-slider.value": window},
+            {"overall-graph-sync.data": None},
+        ),
+        "heatmap": _body(
+            ["heatmap-graph.figure"],
+            {"service-name-dropdown.value": service, "time-range-slider.value": window},
+        ),
+        "time series": _body(
+            ["timeseries-graph.figure"],
+            {
+                "timeseries-service-dropdown.value": service,
+                "timeseries-callee-dropdown.value": None,
+                "time-range-slider.value": window,
+            },
+        ),
+        "event code histogram": _body(
+            ["event-code-histogram.figure"],
+            {"overall-cytoscape-graph.tapEdgeData": None, "dataset-version.data": 0},
+        ),
+    }
+    if edge is not None:
+        views["edge histogram"] = _body(
+            ["edge-histogram-modal.is_open", "edge-eventcode-histogram.figure"],
+            {"overall-cytoscape-graph.tapEdgeData": edge},
+            {"edge-histogram-modal.is_open": False},
+        )
+        views["violin plot"] = _body(
+            ["selected-edge-modal.is_open", "selected-edge-violinplot.figure"],
+            {"cytoscape-graph.tapEdgeData": edge},
+            {
+                "selected-edge-modal.is_open": False,
+                "trace-id-dropdown.value": trace_id,
+                "time-range-slider.value": window,
+            },
+        )
+    return views
+
+
+def _measure(request, repeat: int) -> tuple[int, int, str, float, float]:
+    started = time.perf_counter()
+    raw = request({})
+    first = time.perf_counter() - started
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoded = request({"Accept-Encoding": ACCEPT_ENCODING})
+        times.append(time.perf_counter() - started)
+    return (
+        len(raw.get_data()),
+        len(encoded.get_data()),
+        encoded.headers.get("Content-Encoding", "identity"),
+        first * 1000,
+        statistics.median(times) * 1000,
+    )
+
+
+def run(data_path: str, backend: str, trace_id: str | None, repeat: int) -> None:
+    app = create_app(data_path, backend)
+    client = app.server.test_client()
+    layout = client.get("/_dash-layout").get_json()
+    trace_id = trace_id or _find(layout, "trace-id-dropdown")["value"]
+    edge = _busiest_edge(client, trace_id, _find(layout, "time-range-slider")["value"])
+
+    requests = {
+        "page layout": lambda headers: client.get("/_dash-layout", headers=headers)
+    }
+    for name, body in _views(layout, trace_id, edge).items():
+        requests[name] = lambda headers, body=body: client.post(
+            "/_dash-update-component", json=body, headers=headers
+        )
+
+    print(f"trace {trace_id}, edge {edge and (edge['source'], edge['target'])}")
+    print(
+        f"{'view':<22}{'raw bytes':>12}{'encoded':>10}  {'encoding':<9}"
+        f"{'first ms':>10}{'repeat ms':>10}"
+    )
+    for name, request in requests.items():
+        raw, encoded, encoding, first, repeated = _measure(request, repeat)
+        print(
+            f"{name:<22}{raw:>12,}{encoded:>10,}  {encoding:<9}"
+            f"{first:>10.1f}{repeated:>10.1f}"
+        )
+
+
+def _find(node, component_id):
+    if isinstance(node, dict):
+        props = node.get("props", {})
+        if props.get("id") == component_id:
+            return props
+        node = list(props.values())
+    if isinstance(node, list):
+        for child in node:
+            found = _find(child, component_id)
+            if found is not None:
+                return found
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-path", default="data/processed_data.csv")
+    parser.add_argument("--backend", default="auto")
+    parser.add_argument(
+        "--trace-id", help="Trace for the trace views; defaults to the slowest"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Compressed requests timed per view"
+    )
+    args = parser.parse_args()
+    run(args.data_path, args.backend, args.trace_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
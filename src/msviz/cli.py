@@ -1,10 +1,12 @@
 """Top-level CLI for visualization and preprocessing."""
 
 import argparse
+import logging
 import sys
 from collections.abc import Sequence
+from dataclasses import replace
 
-from .preprocessing import run_preprocessing
+from .preprocessing import PipelineConfig, load_pipeline_config, run_preprocessing
 
 
 def _add_shared_server_flags(parser: argparse.ArgumentParser) -> None:
@@ -12,6 +14,93 @@ def _add_shared_server_flags(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("--port", type=int, default=8050)
     parser.add_argument("--debug", action="store_true")
     parser.add_argument("--data-path", default="data/processed_data.csv")
+    parser.add_argument(
+        "--backend",
+        choices=("auto", "pandas", "duckdb"),
+        default="auto",
+        help="Query backend; auto uses duckdb for Parquet paths and pandas otherwise",
+    )
+    parser.add_argument(
+        "--background-callbacks",
+        action="store_true",
+        help="Run expensive views in background processes (diskcache executor)",
+    )
+    parser.add_argument(
+        "--quick-look",
+        choices=("trace", "time"),
+        default=None,
+        help="Start on a row sample: whole traces, or rows spread evenly over time",
+    )
+    parser.add_argument(
+        "--sample-rows",
+        type=int,
+        default=200_000,
+        help="Most rows kept by --quick-look",
+    )
+    parser.add_argument(
+        "--sample-bucket",
+        default="1min",
+        help="Time interval that --quick-look time samples evenly",
+    )
+    parser.add_argument(
+        "--load-full",
+        action="store_true",
+        help="With --quick-look, load the full dataset in the background and swap it in",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+        default="WARNING",
+        help="INFO logs the rows scanned by each uncached dashboard query",
+    )
+
+
+def _add_shared_preprocess_flags(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--input-csv", default=None)
+    parser.add_argument("--output-csv", default=None)
+    parser.add_argument(
+        "--output-dir",
+        default=None,
+        help="Write time-partitioned Parquet files and a manifest instead of one CSV",
+    )
+    parser.add_argument("--partition-by", choices=("hour", "day"), default="hour")
+    parser.add_argument(
+        "--detect-anomalies",
+        action="store_true",
+        help="Flag per-edge latency regressions and write an anomalies table",
+    )
+    parser.add_argument(
+        "--anomaly-bucket",
+        default="1min",
+        help="Time bucket for anomaly baselines, as a pandas offset (e.g. 30s, 5min)",
+    )
+    parser.add_argument(
+        "--anomaly-threshold",
+        type=float,
+        default=6.0,
+        help="Robust z-score above which a bucket is flagged",
+    )
+    parser.add_argument(
+        "--pipeline-config",
+        default=None,
+        help="JSON or YAML file with steps, output_columns, batch_mb and plugins",
+    )
+    parser.add_argument(
+        "--steps",
+        default=None,
+        help="Comma-separated preprocessing steps, overriding the config file",
+    )
+    parser.add_argument(
+        "--batch-mb",
+        type=int,
+        default=None,
+        help="Stream leading row-local steps over CSV record batches of this size",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rerun preprocessing even if the input and settings are unchanged",
+    )
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -24,23 +113,114 @@ def build_parser() -> argparse.ArgumentParser:
     preprocess_parser = subparsers.add_parser(
         "preprocess", help="Run data preprocessing pipeline"
     )
-    preprocess_parser.add_argument("--input-csv", default=None)
-    preprocess_parser.add_argument("--output-csv", default=None)
+    _add_shared_preprocess_flags(preprocess_parser)
+
+    export_parser = subparsers.add_parser(
+        "export", help="Write dashboard views for a time window to files"
+    )
+    export_parser.add_argument("--data-path", default="data/processed_data.csv")
+    export_parser.add_argument(
+        "--backend", choices=("auto", "pandas", "duckdb"), default="auto"
+    )
+    export_parser.add_argument("--output-dir", default="export")
+    export_parser.add_argument(
+        "--start", default=None, help="Window start, e.g. '2025-06-03 11:00:00'"
+    )
+    export_parser.add_argument("--end", default=None, help="Window end (inclusive)")
+    export_parser.add_argument("--format", choices=("json", "html"), default="json")
+    export_parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes that render views; defaults to the number of CPUs",
+    )
 
     run_parser = subparsers.add_parser(
         "run", help="Run preprocessing pipeline and then start the Dash application"
     )
-    run_parser.add_argument("--input-csv", default=None)
-    run_parser.add_argument("--output-csv", default=None)
+    _add_shared_preprocess_flags(run_parser)
     _add_shared_server_flags(run_parser)
 
     return parser
 
 
-def _run_server(host: str, port: int, debug: bool, data_path: str) -> None:
+def _pipeline_config(args: argparse.Namespace):
+    config = (
+        load_pipeline_config(args.pipeline_config)
+        if args.pipeline_config
+        else PipelineConfig()
+    )
+    if args.steps:
+        config = replace(
+            config, steps=tuple(step.strip() for step in args.steps.split(","))
+        )
+    if args.batch_mb:
+        config = replace(config, batch_mb=args.batch_mb)
+    return config
+
+
+def _run_preprocessing(args: argparse.Namespace):
+    return run_preprocessing(
+        args.input_csv,
+        args.output_csv,
+        args.output_dir,
+        args.partition_by,
+        detect_anomalies=args.detect_anomalies,
+        anomaly_bucket=args.anomaly_bucket,
+        anomaly_threshold=args.anomaly_threshold,
+        config=_pipeline_config(args),
+        force=args.force,
+    )
+
+
+def _print_preprocess_result(result) -> None:
+    if result.cached:
+        print(
+            f"Preprocessing skipped: {result.input_path} and the pipeline settings "
+            f"are unchanged since the last run, reusing output={result.output_path} "
+            "(use --force to rerun)"
+        )
+        return
+    print(
+        "Preprocessing complete: "
+        f"{result.input_rows} rows -> {result.output_rows} rows, "
+        f"output={result.output_path}"
+    )
+    if result.anomalies_path is not None:
+        print(
+            f"Anomalies: {result.anomaly_count} flagged, "
+            f"output={result.anomalies_path}"
+        )
+
+
+def _run_server(
+    host: str,
+    port: int,
+    debug: bool,
+    data_path: str,
+    backend: str = "auto",
+    background_callbacks: bool = False,
+    log_level: str = "WARNING",
+    quick_look: str | None = None,
+    sample_rows: int = 200_000,
+    sample_bucket: str = "1min",
+    load_full: bool = False,
+) -> None:
     from .visualization import create_app
 
-    app = create_app(data_path=data_path)
+    logging.basicConfig(
+        level=log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    app = create_app(
+        data_path=data_path,
+        backend=backend,
+        background_callbacks=background_callbacks,
+        quick_look=quick_look,
+        sample_rows=sample_rows,
+        sample_bucket=sample_bucket,
+        load_full=load_full,
+    )
     app.run(debug=debug, host=host, port=port)
 
 
@@ -53,31 +233,69 @@ def main(argv: Sequence[str] | None = None) -> int:
     args = parser.parse_args(args_list)
 
     if args.command == "serve":
-        _run_server(args.host, args.port, args.debug, args.data_path)
+        _run_server(
+            args.host,
+            args.port,
+            args.debug,
+            args.data_path,
+            args.backend,
+            args.background_callbacks,
+            args.log_level,
+            args.quick_look,
+            args.sample_rows,
+            args.sample_bucket,
+            args.load_full,
+        )
         return 0
 
     if args.command == "preprocess":
-        result = run_preprocessing(args.input_csv, args.output_csv)
+        result = _run_preprocessing(args)
+        _print_preprocess_result(result)
+        return 0
+
+    if args.command == "export":
+        from .visualization import export_views
+
+        result = export_views(
+            args.data_path,
+            args.output_dir,
+            start=args.start,
+            end=args.end,
+            fmt=args.format,
+            workers=args.workers,
+            backend=args.backend,
+        )
         print(
-            "Preprocessing complete: "
-            f"{result.input_rows} rows -> {result.output_rows} rows, "
-            f"output={result.output_path}"
+            f"Export complete: {result.views} views "
+            f"({result.heatmaps} heatmaps, {result.edge_histograms} edge histograms) "
+            f"in {result.seconds:.2f}s ({result.views_per_second:.1f} views/s), "
+            f"output={result.output_dir}"
         )
         return 0
 
     if args.command == "run":
-        result = run_preprocessing(args.input_csv, args.output_csv)
+        result = _run_preprocessing(args)
         data_path = args.data_path
-        if args.output_csv:
+        if args.output_dir:
+            data_path = args.output_dir
+        elif args.output_csv:
             data_path = args.output_csv
 
-        print(
-            "Preprocessing complete: "
-            f"{result.input_rows} rows -> {result.output_rows} rows, "
-            f"output={result.output_path}"
+        _print_preprocess_result(result)
+        _run_server(
+            args.host,
+            args.port,
+            args.debug,
+            data_path,
+            args.backend,
+            args.background_callbacks,
+            args.log_level,
+            args.quick_look,
+            args.sample_rows,
+            args.sample_bucket,
+            args.load_full,
         )
-        _run_server(args.host, args.port, args.debug, data_path)
         return 0
 
-    parser.error("Please specify one of: serve, preprocess, run")
+    parser.error("Please specify one of: serve, preprocess, export, run")
     return 2
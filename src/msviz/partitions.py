@@ -0,0 +1,101 @@
+"""Time-partitioned Parquet layout for processed data and its manifest."""
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import pandas as pd
+
+MANIFEST_NAME = "_manifest.json"
+MANIFEST_VERSION = 1
+PARTITION_FORMATS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d"}
+UNKNOWN_PARTITION = "unknown"
+
+
+@dataclass(frozen=True)
+class PartitionInfo:
+    path: str
+    min_timestamp: str | None
+    max_timestamp: str | None
+    row_count: int
+    services: list
+
+    def overlaps(self, start=None, end=None) -> bool:
+        if self.min_timestamp is None:
+            # Rows without a timestamp can never fall inside a time window.
+            return start is None and end is None
+        if start is not None and pd.Timestamp(self.max_timestamp) < start:
+            return False
+        if end is not None and pd.Timestamp(self.min_timestamp) > end:
+            return False
+        return True
+
+
+def write_partitions(
+    df: pd.DataFrame, root: Path, partition_by: str = "hour"
+) -> list[PartitionInfo]:
+    if partition_by not in PARTITION_FORMATS:
+        raise ValueError(
+            f"Unknown partitioning {partition_by!r}; "
+            f"expected one of {sorted(PARTITION_FORMATS)}"
+        )
+
+    root.mkdir(parents=True, exist_ok=True)
+    for stale in root.glob("*=*/part-*.parquet"):
+        stale.unlink()
+
+    timestamps = pd.to_datetime(
+        df["timestamp"], format="%Y-%m-%d %H:%M:%S:%f", errors="coerce"
+    )
+    keys = timestamps.dt.strftime(PARTITION_FORMATS[partition_by]).fillna(
+        UNKNOWN_PARTITION
+    )
+    output = df.assign(timestamp=timestamps)
+
+    partitions = []
+    for key, part in output.groupby(keys, sort=True):
+        relative_path = Path(f"{partition_by}={key}") / "part-0.parquet"
+        (root / relative_path).parent.mkdir(parents=True, exist_ok=True)
+        part.to_parquet(root / relative_path, index=False)
+
+        part_timestamps = part["timestamp"].dropna()
+        partitions.append(
+            PartitionInfo(
+                path=relative_path.as_posix(),
+                min_timestamp=(
+                    None if part_timestamps.empty else str(part_timestamps.min())
+                ),
+                max_timestamp=(
+                    None if part_timestamps.empty else str(part_timestamps.max())
+                ),
+                row_count=len(part),
+                services=sorted(part["service_name"].dropna().unique().tolist()),
+            )
+        )
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "partition_by": partition_by,
+        "partitions": [asdict(partition) for partition in partitions],
+    }
+    (root / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return partitions
+
+
+def read_manifest(root: Path) -> list[PartitionInfo] | None:
+    manifest_path = root / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    manifest = json.loads(manifest_path.read_text())
+    return [PartitionInfo(**partition) for partition in manifest["partitions"]]
+
+
+def select_partitions(
+    partitions: list[PartitionInfo], start=None, end=None, service_name=None
+) -> list[PartitionInfo]:
+    return [
+        partition
+        for partition in partitions
+        if partition.overlaps(start, end)
+        and (service_name is None or service_name in partition.services)
+    ]
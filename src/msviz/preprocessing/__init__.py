@@ -1,5 +1,18 @@
 """Preprocessing package."""
 
 from .pipeline import PreprocessResult, run_preprocessing
+from .registry import (
+    PipelineConfig,
+    PipelineStep,
+    load_pipeline_config,
+    register_step,
+)
 
-__all__ = ["PreprocessResult", "run_preprocessing"]
+__all__ = [
+    "PipelineConfig",
+    "PipelineStep",
+    "PreprocessResult",
+    "load_pipeline_config",
+    "register_step",
+    "run_preprocessing",
+]
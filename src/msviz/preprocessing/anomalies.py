@@ -0,0 +1,108 @@
+"""Rolling latency baselines and anomaly flags per call edge."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .critical_path import TIMESTAMP_FORMAT
+
+EDGE_COLUMNS = ["service_name", "callee", "event_code"]
+ANOMALY_COLUMNS = [
+    *EDGE_COLUMNS,
+    "window_start",
+    "window_end",
+    "calls",
+    "median_duration",
+    "baseline_duration",
+    "score",
+]
+# Scales a median absolute deviation to a standard deviation for normal data.
+MAD_SCALE = 1.4826
+# Spread assumed for edges whose history is flat, relative to the baseline,
+# and never below the 1 ms resolution of the timestamps (durations are in s).
+MIN_RELATIVE_SPREAD = 0.05
+MIN_SPREAD = 0.001
+
+
+def anomalies_path(output_path: Path, partitioned: bool | None = None) -> Path:
+    # Writers say which layout they produce, since a partition directory may
+    # not exist yet; readers infer it from what is on disk.
+    if partitioned is None:
+        partitioned = output_path.is_dir()
+    if partitioned:
+        return output_path / "_anomalies.csv"
+    return output_path.with_name(f"{output_path.stem}_anomalies.csv")
+
+
+def detect_latency_anomalies(
+    df: pd.DataFrame,
+    bucket: str = "1min",
+    window: int = 30,
+    threshold: float = 6.0,
+    min_calls: int = 5,
+) -> pd.DataFrame:
+    """Flag time buckets in which an edge got slower than its recent history.
+
+    Calls are bucketed per (service_name, callee, event_code) and summarised
+    by their median duration. Each bucket is compared with the rolling median
+    of the edge's previous ``window`` buckets; the spread is the rolling
+    median of past absolute deviations from that baseline, a streaming
+    approximation of the MAD. Buckets with at least ``min_calls`` calls whose
+    robust z-score exceeds ``threshold`` are returned. All edges are handled
+    in one grouped pass, so the cost is linear in rows plus buckets.
+    """
+    timestamps = df["timestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, format=TIMESTAMP_FORMAT, errors="coerce")
+    calls = df[EDGE_COLUMNS].assign(
+        window_start=timestamps.dt.floor(bucket),
+        call_duration=pd.to_numeric(df["call_duration"], errors="coerce"),
+    )
+    calls = calls.dropna(subset=["callee", "window_start", "call_duration"])
+
+    # Group on one integer edge code rather than three string columns; the
+    # edge columns are joined back onto the (much smaller) bucket table.
+    edge = calls.groupby(EDGE_COLUMNS, sort=False, dropna=False, observed=True).ngroup()
+    first_rows = edge.drop_duplicates()
+    edge_keys = calls.loc[first_rows.index, EDGE_COLUMNS].set_axis(
+        first_rows.to_numpy()
+    )
+    buckets = (
+        calls.groupby([edge.rename("edge"), "window_start"])["call_duration"]
+        .agg(calls="size", median_duration="median")
+        .reset_index()
+    )
+    edge = buckets["edge"]
+    median = buckets["median_duration"]
+
+    previous = median.groupby(edge).shift()
+    baseline = _rolling_median(previous, edge, window)
+    deviation = (median - baseline).abs()
+    spread = _rolling_median(deviation.groupby(edge).shift(), edge, window)
+    spread = (MAD_SCALE * spread).clip(
+        lower=np.maximum(MIN_RELATIVE_SPREAD * baseline, MIN_SPREAD)
+    )
+
+    buckets = buckets.join(edge_keys, on="edge").assign(
+        window_end=buckets["window_start"] + pd.Timedelta(bucket),
+        baseline_duration=baseline,
+        score=(median - baseline) / spread,
+    )
+    flagged = (
+        np.isfinite(buckets["score"])
+        & (buckets["score"] > threshold)
+        & (buckets["calls"] >= min_calls)
+    )
+    return buckets.loc[flagged, ANOMALY_COLUMNS].reset_index(drop=True)
+
+
+def _rolling_median(values: pd.Series, edge: pd.Series, window: int) -> pd.Series:
+    min_periods = max(3, window // 3)
+    return (
+        values.groupby(edge)
+        .rolling(window, min_periods=min_periods)
+        .median()
+        .droplevel(0)
+        .reindex(values.index)
+    )
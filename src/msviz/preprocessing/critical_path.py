@@ -0,0 +1,235 @@
+"""Call-tree reconstruction, critical path and latency attribution for traces."""
+
+import numpy as np
+import pandas as pd
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S:%f"
+CALL_TREE_COLUMNS = ["call_depth", "self_duration", "child_duration", "critical_path"]
+
+
+def _as_microseconds(df: pd.DataFrame, duration_scale: float):
+    timestamps = df["timestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, format=TIMESTAMP_FORMAT, errors="coerce")
+    durations = pd.to_numeric(df["call_duration"], errors="coerce")
+
+    valid = (
+        timestamps.notna().to_numpy()
+        & durations.notna().to_numpy()
+        & df["trace_id"].notna().to_numpy()
+    )
+    start = timestamps.to_numpy(dtype="datetime64[us]").astype(np.int64)
+    duration = np.round(durations.fillna(0).to_numpy() * duration_scale).astype(np.int64)
+    return start, start + duration, valid
+
+
+def analyze_call_tree(df: pd.DataFrame, duration_unit: str = "s") -> pd.DataFrame:
+    """Rebuild each trace's call tree and attribute its latency.
+
+    Every processed row is one paired call: ``service_name`` sent a request
+    to ``callee`` at ``timestamp`` and received the response
+    ``call_duration`` later. A call's parent is the innermost call to its
+    caller that was still open when it started. All traces are analysed
+    together with array operations; only the critical path is followed step
+    by step, one step per round for every trace at once.
+
+    Returns a frame aligned with ``df`` with the call's depth in the tree,
+    its self and child time (in ``duration_unit``) and whether it lies on its
+    trace's critical path, i.e. the chain of calls that determined the
+    trace's end-to-end latency.
+    """
+    duration_scale = {"s": 1_000_000, "ms": 1_000}[duration_unit]
+    n = len(df)
+    start, end, valid = _as_microseconds(df, duration_scale)
+    trace = pd.factorize(df["trace_id"])[0]
+    services, _ = pd.factorize(pd.concat([df["service_name"], df["callee"]]))
+    caller, callee = services[:n], services[n:]
+
+    order = np.lexsort((-end, start, trace))
+    order = order[valid[order]]
+
+    parent = np.full(n, -1, dtype=np.int64)
+    for chunk in _trace_chunks(order, trace):
+        _link_parents(chunk, trace, caller, callee, start, end, parent)
+    depth = _depths(parent)
+    child_time = _child_time(order, parent, start, end)
+    critical = _mark_critical_path(order, trace, parent, start, end)
+
+    duration = end - start
+    self_time = np.where(valid, np.maximum(duration - child_time, 0), np.nan)
+    return pd.DataFrame(
+        {
+            "call_depth": np.where(valid, depth, -1),
+            "self_duration": self_time / duration_scale,
+            "child_duration": np.where(valid, child_time, np.nan) / duration_scale,
+            "critical_path": critical,
+        },
+        index=df.index,
+    )
+
+
+def _trace_chunks(order, trace, rows: int = 1 << 20):
+    # Traces are independent, so calls are linked in chunks of whole traces,
+    # which bounds the size of the lookup tables built per chunk.
+    boundaries = np.flatnonzero(np.diff(trace[order])) + 1
+    cuts = np.searchsorted(boundaries, np.arange(rows, len(order), rows))
+    cuts = np.unique(boundaries[cuts[cuts < len(boundaries)]])
+    edges = [0, *cuts.tolist(), len(order)]
+    return [order[lo:hi] for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def _link_parents(order, trace, caller, callee, start, end, parent) -> None:
+    # A call's parent is the latest earlier call (in start order) from the
+    # same trace to its caller service that has not ended by the time it
+    # starts. Calls are grouped by (trace, callee service); searchsorted
+    # finds the calls before each call in its caller's group, and a range-max
+    # sparse table over their end times skips the ones that already ended in
+    # power-of-two blocks.
+    num_services = int(max(caller.max(initial=0), callee.max(initial=0))) + 1
+    chunk_trace = trace[order].astype(np.int64)
+
+    calls = np.flatnonzero(callee[order] >= 0)
+    if not len(calls):
+        return
+    keys = chunk_trace[calls] * num_services + callee[order[calls]]
+    by_group = np.argsort(keys, kind="stable")
+    calls, keys = calls[by_group], keys[by_group]
+    group_keys, group_start, group_size = np.unique(
+        keys, return_index=True, return_counts=True
+    )
+    span = len(order) + 1
+    call_keys = np.repeat(np.arange(len(group_keys)), group_size) * span + calls
+
+    queries = np.flatnonzero(caller[order] >= 0)
+    query_keys = chunk_trace[queries] * num_services + caller[order[queries]]
+    group = np.searchsorted(group_keys, query_keys).clip(max=len(group_keys) - 1)
+    found = group_keys[group] == query_keys
+    queries, group = queries[found], group[found]
+    first = group_start[group]
+    last = np.searchsorted(call_keys, group * span + queries) - 1
+    earlier = last >= first
+    queries, first, last = queries[earlier], first[earlier], last[earlier]
+    threshold = start[order[queries]]
+
+    levels = [end[order[calls]]]
+    while (1 << len(levels)) <= group_size.max():
+        width = 1 << (len(levels) - 1)
+        levels.append(np.maximum(levels[-1][:-width], levels[-1][width:]))
+    for level in range(len(levels) - 1, -1, -1):
+        block_start = last - (1 << level) + 1
+        skip = block_start >= first
+        skip[skip] = levels[level][block_start[skip]] < threshold[skip]
+        last[skip] = block_start[skip] - 1
+    linked = last >= first
+    parent[order[queries[linked]]] = order[calls[last[linked]]]
+
+
+def _depths(parent) -> np.ndarray:
+    # Pointer jumping: each round doubles the distance every call has looked
+    # up its ancestor chain.
+    depth = (parent >= 0).astype(np.int64)
+    ancestor = parent.copy()
+    while True:
+        pending = np.flatnonzero(ancestor >= 0)
+        if not len(pending):
+            return depth
+        up = ancestor[pending]
+        depth[pending] += depth[up]
+        ancestor[pending] = ancestor[up]
+
+
+def _child_time(order, parent, start, end) -> np.ndarray:
+    # The union of a call's children's time, clipped to the call: taken in
+    # start order, each child adds what it covers beyond the latest end of
+    # the children before it.
+    children = order[parent[order] >= 0]
+    children = children[np.argsort(parent[children], kind="stable")]
+    parents = parent[children]
+    child_time = np.zeros(len(parent), dtype=np.int64)
+    if not len(children):
+        return child_time
+    reach = np.minimum(end[children], end[parents])
+    covered = pd.Series(reach).groupby(parents, sort=False).cummax().to_numpy()
+    first = np.r_[True, parents[1:] != parents[:-1]]
+    before = np.r_[start[parents[0]], covered[:-1]]
+    before = np.maximum(np.where(first, start[parents], before), start[parents])
+    gain = np.maximum(reach - np.maximum(start[children], before), 0)
+    np.add.at(child_time, parents, gain)
+    return child_time
+
+
+def _mark_critical_path(order, trace, parent, start, end) -> np.ndarray:
+    # Walk each tree from a virtual root per trace. Working backwards from
+    # the parent's end, the child that finished last is critical; the next
+    # critical child is the last one that finished before that child started.
+    # With siblings sorted by end, both are found with searchsorted for all
+    # calls at once; the walk then advances every trace one call per round.
+    critical = np.zeros(len(trace), dtype=bool)
+    calls = order[np.lexsort((-end[order], parent[order], trace[order]))]
+    if not len(calls):
+        return critical
+    call_trace, call_parent = trace[calls], parent[calls]
+    first = np.r_[
+        True,
+        (call_trace[1:] != call_trace[:-1]) | (call_parent[1:] != call_parent[:-1]),
+    ]
+    group = np.cumsum(first) - 1
+    group_start = np.flatnonzero(first)
+    group_end = np.r_[group_start[1:], len(calls)]
+
+    # Dense ranks of all times, so that a group and an end time form one
+    # sortable key: siblings ascend by key as their ends descend.
+    times, ranks = np.unique(
+        np.concatenate([end[calls], start[calls]]), return_inverse=True
+    )
+    end_rank, start_rank = ranks[: len(calls)], ranks[len(calls):]
+    scale = len(times)
+    keys = group * scale + (scale - 1 - end_rank)
+    rank_of_end = np.zeros(len(trace), dtype=np.int64)
+    rank_of_end[calls] = end_rank
+
+    def first_ending_by(groups, rank):
+        found = np.searchsorted(keys, groups * scale + (scale - 1 - rank))
+        return np.where(found < group_end[groups], found, -1)
+
+    # The next critical sibling ends by the time this one starts. It can only
+    # be found at or before this one when zero-length calls tie on end, in
+    # which case it is simply the next sibling.
+    position = np.arange(len(calls))
+    following = first_ending_by(group, start_rank)
+    behind = (following >= 0) & (following <= position)
+    following[behind] = np.where(
+        position[behind] + 1 < group_end[group[behind]], position[behind] + 1, -1
+    )
+    group_parent = call_parent[group_start]
+    nested = np.flatnonzero(group_parent >= 0)
+    child_group = np.full(len(trace), -1, dtype=np.int64)
+    child_group[group_parent[nested]] = nested
+    head = np.full(len(group_start), -1, dtype=np.int64)
+    head[group_parent < 0] = group_start[group_parent < 0]
+    head[nested] = first_ending_by(nested, rank_of_end[group_parent[nested]])
+
+    frontier = head[group_parent < 0]
+    while len(frontier):
+        critical[calls[frontier]] = True
+        below = child_group[calls[frontier]]
+        frontier = np.concatenate([following[frontier], head[below[below >= 0]]])
+        frontier = frontier[frontier >= 0]
+    return critical
+
+
+def summarize_latency_attribution(calls: pd.DataFrame) -> pd.DataFrame:
+    """Self vs child time per called service, from ``analyze_call_tree`` columns."""
+    grouped = calls.dropna(subset=["callee", "self_duration"]).groupby("callee")
+    return (
+        grouped.agg(
+            calls=("self_duration", "size"),
+            total_time=("call_duration", "sum"),
+            self_time=("self_duration", "sum"),
+            child_time=("child_duration", "sum"),
+            critical_calls=("critical_path", "sum"),
+        )
+        .reset_index()
+        .rename(columns={"callee": "service"})
+        .sort_values("self_time", ascending=False)
+    )
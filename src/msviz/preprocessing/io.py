@@ -19,8 +19,36 @@ def resolve_output_csv_path(output_csv: str | None = None) -> Path:
     return package_root / "data/processed_data.csv"
 
 
-def read_csv(path: Path) -> pd.DataFrame:
-    return pd.read_csv(path)
+def read_csv_header(path: Path) -> list[str]:
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+
+def read_csv(path: Path, columns=None) -> pd.DataFrame:
+    return pd.read_csv(path, usecols=list(columns) if columns is not None else None)
+
+
+def iter_csv_batches(path: Path, columns=None, batch_mb: int = 64):
+    """Yield the CSV as DataFrames of Arrow record batches of about ``batch_mb``.
+
+    Every column is read as text: types inferred from the first block could
+    clash with later ones, and the preprocessing steps parse what they need.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    names = read_csv_header(path)
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=batch_mb << 20),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            include_columns=list(columns) if columns is not None else None,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
 
 
 def write_csv(df: pd.DataFrame, path: Path) -> None:
@@ -1,15 +1,33 @@
 """Preprocessing pipeline orchestration."""
 
-from dataclasses import dataclass
+import json
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
-from .io import read_csv, resolve_input_csv_path, resolve_output_csv_path, write_csv
-from .steps import (
-    add_call_duration,
-    add_callee_column,
-    drop_missing_call_duration,
-    filter_client_rows,
+import pandas as pd
+
+from ..partitions import write_partitions
+from .anomalies import anomalies_path, detect_latency_anomalies
+from .cache import (
+    build_fingerprint,
+    clear_cache_manifest,
+    read_cache_manifest,
+    step_fingerprint,
+    write_cache_manifest,
+)
+from .io import (
+    iter_csv_batches,
+    read_csv,
+    read_csv_header,
+    resolve_input_csv_path,
+    resolve_output_csv_path,
+    write_csv,
 )
+from .registry import PipelineConfig, plan_pipeline, resolve_steps
+
+# Step sources are part of the cache fingerprint; bump this when the output
+# changes through anything else, such as a helper module the steps call.
+PIPELINE_VERSION = 1
 
 
 @dataclass(frozen=True)
@@ -18,26 +36,113 @@ class PreprocessResult:
     output_path: Path
     input_rows: int
     output_rows: int
+    anomalies_path: Path | None = None
+    anomaly_count: int = 0
+    cached: bool = False
 
 
 def run_preprocessing(
     input_csv: str | None = None,
     output_csv: str | None = None,
+    output_dir: str | None = None,
+    partition_by: str = "hour",
+    detect_anomalies: bool = False,
+    anomaly_bucket: str = "1min",
+    anomaly_threshold: float = 6.0,
+    config: PipelineConfig | None = None,
+    force: bool = False,
 ) -> PreprocessResult:
+    config = config or PipelineConfig()
     input_path = resolve_input_csv_path(input_csv)
-    output_path = resolve_output_csv_path(output_csv)
+    partitioned = output_dir is not None
+    output_path = Path(output_dir) if partitioned else resolve_output_csv_path(output_csv)
+    sidecar_path = anomalies_path(output_path, partitioned)
+
+    steps = resolve_steps(config.steps, config.plugins)
+    settings = {
+        "pipeline_version": PIPELINE_VERSION,
+        "steps": [[step.name, step_fingerprint(step)] for step in steps],
+        "config": asdict(config),
+        "partition_by": partition_by if partitioned else None,
+        "anomalies": [anomaly_bucket, anomaly_threshold] if detect_anomalies else None,
+    }
+    # Round-trip through JSON so tuples compare equal to the stored lists.
+    fingerprint = json.loads(json.dumps(build_fingerprint(input_path, settings)))
+    manifest = None if force else read_cache_manifest(output_path, partitioned)
+    if (
+        manifest is not None
+        and manifest["fingerprint"] == fingerprint
+        and output_path.exists()
+        and (not detect_anomalies or sidecar_path.exists())
+    ):
+        return PreprocessResult(
+            input_path=input_path,
+            output_path=output_path,
+            anomalies_path=sidecar_path if detect_anomalies else None,
+            cached=True,
+            **manifest["result"],
+        )
+    # Outputs are about to be overwritten; a run that fails halfway must not
+    # leave a manifest vouching for them.
+    clear_cache_manifest(output_path, partitioned)
 
-    raw_df = read_csv(input_path)
-    filtered_df = filter_client_rows(raw_df)
-    with_callee_df = add_callee_column(filtered_df)
-    with_duration_df = add_call_duration(with_callee_df)
-    final_df = drop_missing_call_duration(with_duration_df)
+    plan = plan_pipeline(steps, read_csv_header(input_path), config.output_columns)
+    stages = list(plan.stages)
 
-    write_csv(final_df, output_path)
+    if config.batch_mb and stages and stages[0].row_local:
+        # Filters and per-row columns at the head of the pipeline run batch by
+        # batch while the input is read, so rows they drop are never held.
+        head = stages.pop(0)
+        input_rows = 0
+        batches = []
+        for batch in iter_csv_batches(input_path, plan.input_columns, config.batch_mb):
+            input_rows += len(batch)
+            batches.append(head.run(batch))
+        if not batches:
+            # A header-only input yields no batches; reading it whole gives the
+            # empty frame with the input's columns.
+            batches.append(head.run(read_csv(input_path, plan.input_columns)))
+        final_df = pd.concat(batches, ignore_index=True)
+    else:
+        final_df = read_csv(input_path, plan.input_columns)
+        input_rows = len(final_df)
+    for stage in stages:
+        final_df = stage.run(final_df)
+    if config.output_columns is not None:
+        final_df = final_df[list(config.output_columns)]
 
+    if partitioned:
+        write_partitions(final_df, output_path, partition_by)
+    else:
+        write_csv(final_df, output_path)
+
+    # The dashboard overlays whatever anomalies table sits next to the data,
+    # so a run without detection must not leave a stale one behind.
+    anomaly_count = 0
+    if detect_anomalies:
+        anomalies = detect_latency_anomalies(
+            final_df, bucket=anomaly_bucket, threshold=anomaly_threshold
+        )
+        write_csv(anomalies, sidecar_path)
+        anomaly_count = len(anomalies)
+    else:
+        sidecar_path.unlink(missing_ok=True)
+
+    write_cache_manifest(
+        output_path,
+        fingerprint,
+        {
+            "input_rows": input_rows,
+            "output_rows": len(final_df),
+            "anomaly_count": anomaly_count,
+        },
+        partitioned,
+    )
     return PreprocessResult(
         input_path=input_path,
         output_path=output_path,
-        input_rows=len(raw_df),
+        input_rows=input_rows,
         output_rows=len(final_df),
+        anomalies_path=sidecar_path if detect_anomalies else None,
+        anomaly_count=anomaly_count,
     )
@@ -0,0 +1,160 @@
+"""Registry of preprocessing steps and the execution plan built from it."""
+
+import importlib
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+STEPS: dict = {}
+DEFAULT_STEPS = (
+    "filter_client_rows",
+    "add_callee_column",
+    "add_call_duration",
+    "drop_missing_call_duration",
+    "add_critical_path",
+)
+
+
+@dataclass(frozen=True)
+class PipelineStep:
+    """A DataFrame -> DataFrame transform and the columns it touches.
+
+    ``row_local`` steps derive each output row from the same input row alone
+    (filters and per-row columns), so they can run on any slice of the input,
+    such as one record batch, with the same result.
+    """
+
+    name: str
+    func: Callable[[pd.DataFrame], pd.DataFrame]
+    reads: tuple[str, ...]
+    writes: tuple[str, ...] = ()
+    row_local: bool = False
+
+
+def register_step(
+    reads: tuple[str, ...],
+    writes: tuple[str, ...] = (),
+    row_local: bool = False,
+    name: str | None = None,
+):
+    def decorator(func):
+        step_name = name or func.__name__
+        STEPS[step_name] = PipelineStep(
+            step_name, func, tuple(reads), tuple(writes), row_local
+        )
+        return func
+
+    return decorator
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    steps: tuple[str, ...] = DEFAULT_STEPS
+    # Columns of the processed output; None keeps every input column.
+    output_columns: tuple[str, ...] | None = None
+    # Stream the leading row-local steps over CSV record batches of this size.
+    batch_mb: int | None = None
+    # Modules imported before planning so that they can register steps.
+    plugins: tuple[str, ...] = ()
+
+
+def load_pipeline_config(path: str) -> PipelineConfig:
+    config_path = Path(path)
+    text = config_path.read_text()
+    if config_path.suffix in (".yaml", ".yml"):
+        import yaml
+
+        raw = yaml.safe_load(text) or {}
+    else:
+        raw = json.loads(text)
+
+    unknown = set(raw) - set(PipelineConfig.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"Unknown pipeline config keys: {sorted(unknown)}")
+    return PipelineConfig(
+        **{
+            key: tuple(value) if isinstance(value, list) else value
+            for key, value in raw.items()
+        }
+    )
+
+
+@dataclass(frozen=True)
+class Stage:
+    steps: tuple[PipelineStep, ...]
+    # Columns still needed after this stage; None keeps all of them.
+    keep_columns: tuple[str, ...] | None = None
+
+    @property
+    def row_local(self) -> bool:
+        return all(step.row_local for step in self.steps)
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        for step in self.steps:
+            df = step.func(df)
+        if self.keep_columns is not None:
+            df = df[[column for column in df.columns if column in self.keep_columns]]
+        return df
+
+
+@dataclass(frozen=True)
+class PipelinePlan:
+    input_columns: tuple[str, ...] | None
+    stages: tuple[Stage, ...]
+
+
+def resolve_steps(names, plugins=()) -> list[PipelineStep]:
+    # Importing the built-in steps registers them.
+    from . import steps  # noqa: F401
+
+    for module in plugins:
+        importlib.import_module(module)
+    unknown = [name for name in names if name not in STEPS]
+    if unknown:
+        raise ValueError(
+            f"Unknown preprocessing steps {unknown}; expected some of {sorted(STEPS)}"
+        )
+    return [STEPS[name] for name in names]
+
+
+def plan_pipeline(
+    steps: list[PipelineStep], input_columns, output_columns=None
+) -> PipelinePlan:
+    """Check the declared columns and fuse consecutive row-local steps.
+
+    With ``output_columns`` set, only the columns some step reads or the
+    output keeps are read from the input, and each stage drops the columns
+    no later stage or the output needs.
+    """
+    available = set(input_columns)
+    for step in steps:
+        missing = [column for column in step.reads if column not in available]
+        if missing:
+            raise ValueError(f"Step {step.name!r} reads missing columns {missing}")
+        available.update(step.writes)
+    if output_columns is not None:
+        missing = [column for column in output_columns if column not in available]
+        if missing:
+            raise ValueError(f"Output columns {missing} are not produced")
+
+    groups: list[list[PipelineStep]] = []
+    for step in steps:
+        if step.row_local and groups and all(s.row_local for s in groups[-1]):
+            groups[-1].append(step)
+        else:
+            groups.append([step])
+
+    if output_columns is None:
+        return PipelinePlan(None, tuple(Stage(tuple(group)) for group in groups))
+
+    stages = []
+    needed = set(output_columns)
+    for group in reversed(groups):
+        stages.append(Stage(tuple(group), tuple(sorted(needed))))
+        for step in group:
+            needed.update(step.reads)
+    read_columns = tuple(column for column in input_columns if column in needed)
+    return PipelinePlan(read_columns, tuple(reversed(stages)))
@@ -5,7 +5,11 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 
+from .critical_path import CALL_TREE_COLUMNS, analyze_call_tree
+from .registry import register_step
 
+
+@register_step(reads=("message",), row_local=True)
 def filter_client_rows(df: pd.DataFrame) -> pd.DataFrame:
     messages = df.get("message", pd.Series(dtype=str)).fillna("")
     mask = messages.str.contains("-> Client", regex=False) | messages.str.contains(
@@ -14,6 +18,7 @@ def filter_client_rows(df: pd.DataFrame) -> pd.DataFrame:
     return df.loc[mask].copy()
 
 
+@register_step(reads=("message",), writes=("callee",), row_local=True)
 def add_callee_column(df: pd.DataFrame) -> pd.DataFrame:
     result = df.copy()
 
@@ -28,6 +33,10 @@ def add_callee_column(df: pd.DataFrame) -> pd.DataFrame:
     return result
 
 
+@register_step(
+    reads=("timestamp", "message", "event_provider"),
+    writes=("timestamp", "call_duration"),
+)
 def add_call_duration(df: pd.DataFrame) -> pd.DataFrame:
     result = df.copy()
     parsed = pd.to_datetime(
@@ -64,7 +73,16 @@ def add_call_duration(df: pd.DataFrame) -> pd.DataFrame:
     return result
 
 
+@register_step(reads=("call_duration",), writes=("call_duration",), row_local=True)
 def drop_missing_call_duration(df: pd.DataFrame) -> pd.DataFrame:
     result = df.copy()
     result["call_duration"] = pd.to_numeric(result["call_duration"], errors="coerce")
     return result[result["call_duration"].notna()].copy()
+
+
+@register_step(
+    reads=("trace_id", "timestamp", "call_duration", "service_name", "callee"),
+    writes=tuple(CALL_TREE_COLUMNS),
+)
+def add_critical_path(df: pd.DataFrame) -> pd.DataFrame:
+    return df.join(analyze_call_tree(df))
@@ -1,5 +1,6 @@
 """Visualization package."""
 
 from .app_factory import create_app
+from .export import ExportResult, export_views
 
-__all__ = ["create_app"]
+__all__ = ["ExportResult", "create_app", "export_views"]
@@ -2,18 +2,78 @@
 
 import dash
 import dash_bootstrap_components as dbc
+import flask
 
 from .callbacks import register_callbacks
-from .data import build_context, load_data
+from .data import load_anomalies
+from .dataset import DatasetHolder, open_dataset, open_sample
+from .instrumentation import log_callback_payloads
 from .layout import build_layout
 from .styles import overall_stylesheet
 
 
-def create_app(data_path: str = "data/processed_data.csv"):
-    data = load_data(data_path)
-    context = build_context(data)
+def create_app(
+    data_path: str = "data/processed_data.csv",
+    backend: str = "auto",
+    background_callbacks: bool = False,
+    quick_look: str | None = None,
+    sample_rows: int = 200_000,
+    sample_bucket: str = "1min",
+    load_full: bool = False,
+):
+    """Build the dashboard app.
 
-    app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
-    app.layout = build_layout(context, data, overall_stylesheet)
-    register_callbacks(app, data, overall_stylesheet)
+    ``quick_look`` ("trace" or "time") starts on a sample of at most
+    ``sample_rows`` rows; with ``load_full`` the full dataset is then loaded
+    in the background and replaces the sample when ready.
+    """
+    if quick_look:
+        datasets = DatasetHolder(
+            open_sample(data_path, quick_look, sample_rows, sample_bucket)
+        )
+        if load_full:
+            datasets.load_in_background(data_path, backend)
+    else:
+        datasets = DatasetHolder(open_dataset(data_path, backend))
+    anomalies = load_anomalies(data_path)
+
+    background_callback_manager = None
+    if background_callbacks:
+        import diskcache
+
+        background_callback_manager = dash.DiskcacheManager(diskcache.Cache())
+
+    # Figures and element lists are repetitive JSON and compress well.
+    # flask-compress reads its algorithms when Dash attaches it, so they are
+    # set on the server beforehand; low levels keep large payloads fast.
+    server = flask.Flask(__name__)
+    server.config.update(
+        COMPRESS_ALGORITHM=["br", "gzip"], COMPRESS_BR_LEVEL=4, COMPRESS_LEVEL=6
+    )
+    app = dash.Dash(
+        __name__,
+        server=server,
+        compress=True,
+        external_stylesheets=[dbc.themes.BOOTSTRAP],
+        background_callback_manager=background_callback_manager,
+    )
+    log_callback_payloads(app.server)
+
+    def serve_layout():
+        # Built per page load from one snapshot of the holder, so a page
+        # opened after the full dataset is swapped in starts from it, and one
+        # opened mid-load polls for it.
+        dataset, version, loading = datasets.snapshot()
+        return build_layout(
+            dataset, overall_stylesheet, anomalies, loading=loading, version=version
+        )
+
+    app.layout = serve_layout
+    register_callbacks(
+        app,
+        datasets,
+        overall_stylesheet,
+        background=background_callbacks,
+        anomalies=anomalies,
+    )
     return app
@@ -0,0 +1,565 @@
+"""Query backends used by the dashboard to read the processed dataset."""
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import pandas as pd
+
+from ..partitions import read_manifest, select_partitions
+from .data import DataContext, build_context, load_data, resolve_data_path
+from .trace_index import (
+    ERROR_EVENT_PATTERN,
+    build_trace_summaries,
+    finalize_trace_summaries,
+)
+
+BACKEND_CHOICES = ("auto", "pandas", "duckdb")
+
+
+def summarize_edge_latency(df: pd.DataFrame) -> pd.DataFrame:
+    """Calls and mean call duration per (service_name, callee) edge."""
+    return (
+        df.dropna(subset=["service_name", "callee"])
+        .groupby(["service_name", "callee"])
+        .agg(calls=("call_duration", "size"), mean_duration=("call_duration", "mean"))
+        .reset_index()
+    )
+
+
+class QueryBackend(ABC):
+    """Filters and aggregations needed by the callbacks and graph builders.
+
+    ``start``/``end`` are inclusive ``pd.Timestamp`` bounds; ``None`` means
+    unbounded. Aggregating methods return small frames so that callers never
+    need the full dataset in memory.
+    """
+
+    @abstractmethod
+    def build_context(self) -> DataContext: ...
+
+    @abstractmethod
+    def count_rows(self, start=None, end=None) -> int: ...
+
+    @abstractmethod
+    def scan_size(self, start=None, end=None, service_name=None) -> int:
+        """Rows a query with these filters reads, known without running it."""
+
+    @abstractmethod
+    def rows(
+        self,
+        start=None,
+        end=None,
+        trace_id=None,
+        transaction_id=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def edge_counts(self, start=None, end=None) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def edge_latency(self, start=None, end=None, trace_id=None) -> pd.DataFrame:
+        """Calls and mean duration per edge, for a time window or one trace."""
+
+    @abstractmethod
+    def event_code_counts(self, service_name=None, callee=None) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def heatmap_cells(self, service_name, start=None, end=None) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def heatmap_cells_by_service(self, start=None, end=None) -> pd.DataFrame:
+        """Mean call duration per (service_name, event_code, callee)."""
+
+    @abstractmethod
+    def event_code_counts_by_edge(self, start=None, end=None) -> pd.DataFrame:
+        """Calls per (service_name, callee, event_code), most frequent first."""
+
+    @abstractmethod
+    def span_ids(self, trace_id) -> list: ...
+
+    @abstractmethod
+    def trace_summaries(self) -> pd.DataFrame: ...
+
+    @abstractmethod
+    def latency_rollup(
+        self,
+        resolution_seconds: int,
+        by_callee: bool = False,
+        start=None,
+        end=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        """Calls, p50 and p95 duration per service (or edge) and time bucket."""
+
+
+class PandasBackend(QueryBackend):
+    """In-memory backend over a single DataFrame sorted by timestamp."""
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data.sort_values("timestamp", kind="stable").reset_index(drop=True)
+
+    def _window(self, start=None, end=None) -> pd.DataFrame:
+        timestamps = self.data["timestamp"]
+        lo = 0 if start is None else timestamps.searchsorted(start, side="left")
+        hi = len(timestamps) if end is None else timestamps.searchsorted(end, side="right")
+        return self.data.iloc[lo:hi]
+
+    def build_context(self) -> DataContext:
+        return build_context(self.data)
+
+    def count_rows(self, start=None, end=None) -> int:
+        return len(self._window(start, end))
+
+    def scan_size(self, start=None, end=None, service_name=None) -> int:
+        # Every filter is applied to the time window slice.
+        return len(self._window(start, end))
+
+    def rows(
+        self,
+        start=None,
+        end=None,
+        trace_id=None,
+        transaction_id=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        df = self._window(start, end)
+        filters = {
+            "trace_id": trace_id,
+            "transaction_id": transaction_id,
+            "service_name": service_name,
+            "callee": callee,
+        }
+        for column, value in filters.items():
+            if value is not None:
+                df = df[df[column] == value]
+        return df
+
+    def edge_counts(self, start=None, end=None) -> pd.DataFrame:
+        return (
+            self._window(start, end)
+            .dropna(subset=["service_name", "callee"])
+            .groupby(["service_name", "callee"])
+            .size()
+            .reset_index(name="count")
+        )
+
+    def edge_latency(self, start=None, end=None, trace_id=None) -> pd.DataFrame:
+        return summarize_edge_latency(self.rows(start, end, trace_id=trace_id))
+
+    def event_code_counts(self, service_name=None, callee=None) -> pd.DataFrame:
+        df = self.rows(service_name=service_name, callee=callee)
+        return (
+            df.groupby("event_code")
+            .size()
+            .reset_index(name="count")
+            .sort_values("count", ascending=False)
+        )
+
+    def heatmap_cells(self, service_name, start=None, end=None) -> pd.DataFrame:
+        df = self.rows(start=start, end=end, service_name=service_name)
+        return (
+            df.groupby(["event_code", "callee"])["call_duration"].mean().reset_index()
+        )
+
+    def heatmap_cells_by_service(self, start=None, end=None) -> pd.DataFrame:
+        calls = self._window(start, end).dropna(subset=["service_name", "callee"])
+        return (
+            calls.groupby(["service_name", "event_code", "callee"])["call_duration"]
+            .mean()
+            .reset_index()
+        )
+
+    def event_code_counts_by_edge(self, start=None, end=None) -> pd.DataFrame:
+        calls = self._window(start, end).dropna(subset=["service_name", "callee"])
+        return (
+            calls.groupby(["service_name", "callee", "event_code"])
+            .size()
+            .reset_index(name="count")
+            .sort_values(
+                ["service_name", "callee", "count"],
+                ascending=[True, True, False],
+                kind="stable",
+            )
+        )
+
+    def span_ids(self, trace_id) -> list:
+        df = self.data[self.data["trace_id"] == trace_id]
+        return df["transaction_id"].dropna().unique().tolist()
+
+    def trace_summaries(self) -> pd.DataFrame:
+        return build_trace_summaries(self.data)
+
+    def latency_rollup(
+        self,
+        resolution_seconds: int,
+        by_callee: bool = False,
+        start=None,
+        end=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        keys = ["service_name", "callee"] if by_callee else ["service_name"]
+        calls = self.rows(start, end, service_name=service_name, callee=callee)
+        calls = calls.dropna(subset=[*keys, "timestamp", "call_duration"])
+        if calls.empty:
+            return pd.DataFrame(columns=[*keys, "bucket", "calls", "p50", "p95"])
+        bucket = calls["timestamp"].dt.floor(f"{resolution_seconds}s").rename("bucket")
+        grouped = calls.groupby([*(calls[key] for key in keys), bucket])[
+            "call_duration"
+        ]
+        quantiles = grouped.quantile([0.5, 0.95]).unstack()
+        return pd.DataFrame(
+            {
+                "calls": grouped.size(),
+                "p50": quantiles[0.5],
+                "p95": quantiles[0.95],
+            }
+        ).reset_index()
+
+
+class DuckDBBackend(QueryBackend):
+    """Embedded DuckDB backend over Parquet files, partition directories or a CSV.
+
+    Filters and group-bys run inside DuckDB, so only the aggregated or
+    filtered result is materialized as a DataFrame. When the directory carries
+    a partition manifest, each query only scans the partitions whose time range
+    and service set can match its filters.
+    """
+
+    def __init__(self, parquet_path: Path):
+        self.parquet_path = Path(parquet_path)
+        self.partitions = (
+            read_manifest(self.parquet_path) if self.parquet_path.is_dir() else None
+        )
+        self._total_rows = None
+        self._connect()
+
+    def _connect(self) -> None:
+        import duckdb
+
+        self._pid = os.getpid()
+        self._connection = duckdb.connect(database=":memory:")
+        source = self._source_sql(self._all_files())
+        columns = {
+            row[0]: row[1]
+            for row in self._connection.execute(
+                f"DESCRIBE SELECT * FROM {source}"
+            ).fetchall()
+        }
+        self._columns = columns
+        self._timestamp_sql = "timestamp"
+        if columns.get("timestamp") == "VARCHAR":
+            self._timestamp_sql = "try_strptime(timestamp, '%Y-%m-%d %H:%M:%S:%g')"
+        self._connection.execute(f"CREATE VIEW events AS {self._select_sql(source)}")
+
+    def _all_files(self) -> list[str]:
+        if self.partitions:
+            return [
+                (self.parquet_path / partition.path).as_posix()
+                for partition in self.partitions
+            ]
+        if self.parquet_path.is_dir():
+            return [(self.parquet_path / "**" / "*.parquet").as_posix()]
+        return [self.parquet_path.as_posix()]
+
+    def _source_sql(self, files: list[str]) -> str:
+        escaped = ", ".join("'" + file.replace("'", "''") + "'" for file in files)
+        # A processed CSV is scanned in place; its timestamps are read as
+        # text and parsed by the events view like string-typed Parquet ones.
+        csv = self.parquet_path.suffix == ".csv"
+        reader = "read_csv_auto" if csv else "read_parquet"
+        # Partition metadata comes from the manifest; hive columns inferred
+        # from the hour=/day= directories would not exist with pandas.
+        return (
+            f"{reader}([{escaped}], union_by_name = true, hive_partitioning = false)"
+        )
+
+    def _select_sql(self, source: str) -> str:
+        replacements = [f"CAST({self._timestamp_sql} AS TIMESTAMP) AS timestamp"]
+        for column in ("call_duration", "self_duration", "child_duration"):
+            if column in self._columns:
+                replacements.append(f"CAST({column} AS DOUBLE) * 1000 AS {column}")
+        return f"SELECT * REPLACE ({', '.join(replacements)}) FROM {source}"
+
+    def _events(self, start=None, end=None, service_name=None) -> str:
+        if not self.partitions or (
+            start is None and end is None and service_name is None
+        ):
+            return "events"
+
+        selected = select_partitions(self.partitions, start, end, service_name)
+        if len(selected) == len(self.partitions):
+            return "events"
+        if not selected:
+            return "(SELECT * FROM events LIMIT 0) AS events"
+        files = [
+            (self.parquet_path / partition.path).as_posix() for partition in selected
+        ]
+        return f"({self._select_sql(self._source_sql(files))}) AS events"
+
+    def _cursor(self):
+        # DuckDB connections are not fork-safe, so background-callback worker
+        # processes open their own. A cursor per query keeps the connection safe
+        # across Flask worker threads.
+        if self._pid != os.getpid():
+            self._connect()
+        return self._connection.cursor()
+
+    def _query(self, sql: str, params: list | None = None) -> pd.DataFrame:
+        return self._cursor().execute(sql, params or []).df()
+
+    @staticmethod
+    def _where(
+        start=None,
+        end=None,
+        trace_id=None,
+        transaction_id=None,
+        service_name=None,
+        callee=None,
+    ):
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(pd.Timestamp(start).to_pydatetime())
+        if end is not None:
+            clauses.append("timestamp <= ?")
+            params.append(pd.Timestamp(end).to_pydatetime())
+        filters = {
+            "trace_id": trace_id,
+            "transaction_id": transaction_id,
+            "service_name": service_name,
+            "callee": callee,
+        }
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def build_context(self) -> DataContext:
+        min_ts, max_ts, num_records = self._cursor().execute(
+            "SELECT min(timestamp), max(timestamp), count(*) FROM events"
+        ).fetchone()
+        service_names = self._query(
+            "SELECT DISTINCT service_name FROM events "
+            "WHERE service_name IS NOT NULL ORDER BY service_name"
+        )["service_name"].tolist()
+        min_ts = pd.Timestamp(min_ts)
+        max_ts = pd.Timestamp(max_ts)
+
+        return DataContext(
+            num_records=num_records,
+            service_names=service_names,
+            first_timestamp=min_ts.strftime("%Y-%m-%d %H:%M:%S"),
+            last_timestamp=max_ts.strftime("%Y-%m-%d %H:%M:%S"),
+            min_timestamp=int(min_ts.timestamp()),
+            max_timestamp=int(max_ts.timestamp()),
+        )
+
+    def count_rows(self, start=None, end=None) -> int:
+        where, params = self._where(start, end)
+        return self._cursor().execute(
+            f"SELECT count(*) FROM {self._events(start, end)}{where}", params
+        ).fetchone()[0]
+
+    def scan_size(self, start=None, end=None, service_name=None) -> int:
+        # The partitions a query reads are known from the manifest; a single
+        # file is counted once from its Parquet metadata and reported in full,
+        # as an upper bound on what row-group pruning leaves to scan.
+        if self.partitions:
+            selected = select_partitions(self.partitions, start, end, service_name)
+            return sum(partition.row_count for partition in selected)
+        if self._total_rows is None:
+            self._total_rows = self.count_rows()
+        return self._total_rows
+
+    def rows(
+        self,
+        start=None,
+        end=None,
+        trace_id=None,
+        transaction_id=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        where, params = self._where(
+            start, end, trace_id, transaction_id, service_name, callee
+        )
+        events = self._events(start, end, service_name)
+        return self._query(f"SELECT * FROM {events}{where} ORDER BY timestamp", params)
+
+    def edge_counts(self, start=None, end=None) -> pd.DataFrame:
+        where, params = self._where(start, end)
+        where += " AND " if where else " WHERE "
+        events = self._events(start, end)
+        return self._query(
+            f"SELECT service_name, callee, count(*) AS count FROM {events}"
+            f"{where}service_name IS NOT NULL AND callee IS NOT NULL "
+            "GROUP BY service_name, callee ORDER BY service_name, callee",
+            params,
+        )
+
+    def edge_latency(self, start=None, end=None, trace_id=None) -> pd.DataFrame:
+        where, params = self._where(start, end, trace_id)
+        where += " AND " if where else " WHERE "
+        return self._query(
+            "SELECT service_name, callee, count(*) AS calls, "
+            f"avg(call_duration) AS mean_duration FROM {self._events(start, end)}"
+            f"{where}service_name IS NOT NULL AND callee IS NOT NULL "
+            "GROUP BY service_name, callee ORDER BY service_name, callee",
+            params,
+        )
+
+    def event_code_counts(self, service_name=None, callee=None) -> pd.DataFrame:
+        where, params = self._where(service_name=service_name, callee=callee)
+        return self._query(
+            "SELECT event_code, count(*) AS count "
+            f"FROM {self._events(service_name=service_name)}{where} "
+            "GROUP BY event_code ORDER BY count DESC",
+            params,
+        )
+
+    def heatmap_cells(self, service_name, start=None, end=None) -> pd.DataFrame:
+        where, params = self._where(start, end, service_name=service_name)
+        return self._query(
+            "SELECT event_code, callee, avg(call_duration) AS call_duration "
+            f"FROM {self._events(start, end, service_name)}{where} "
+            "GROUP BY event_code, callee",
+            params,
+        )
+
+    def _calls_sql(self, columns: str, start=None, end=None) -> tuple[str, list]:
+        where, params = self._where(start, end)
+        where += " AND " if where else " WHERE "
+        return (
+            f"SELECT {columns} FROM {self._events(start, end)}"
+            f"{where}service_name IS NOT NULL AND callee IS NOT NULL "
+        ), params
+
+    def heatmap_cells_by_service(self, start=None, end=None) -> pd.DataFrame:
+        sql, params = self._calls_sql(
+            "service_name, event_code, callee, avg(call_duration) AS call_duration",
+            start,
+            end,
+        )
+        return self._query(
+            sql + "GROUP BY ALL ORDER BY service_name, event_code, callee", params
+        )
+
+    def event_code_counts_by_edge(self, start=None, end=None) -> pd.DataFrame:
+        sql, params = self._calls_sql(
+            "service_name, callee, event_code, count(*) AS count", start, end
+        )
+        return self._query(
+            sql + "GROUP BY ALL ORDER BY service_name, callee, count DESC, event_code",
+            params,
+        )
+
+    def span_ids(self, trace_id) -> list:
+        where, params = self._where(trace_id=trace_id)
+        return self._query(
+            f"SELECT transaction_id FROM events{where} AND transaction_id IS NOT NULL "
+            "GROUP BY transaction_id ORDER BY min(timestamp)",
+            params,
+        )["transaction_id"].tolist()
+
+    def trace_summaries(self) -> pd.DataFrame:
+        if "critical_path" in self._columns:
+            critical_path_sql = (
+                "critical AS ("
+                "SELECT trace_id, coalesce(sum(call_duration) FILTER ("
+                "WHERE critical_path AND call_depth = 0), 0) AS critical_path_ms "
+                "FROM calls GROUP BY trace_id) "
+            )
+        else:
+            # Same in-flight time as the pandas summaries: overlapping call
+            # intervals are merged into segments with window functions.
+            critical_path_sql = (
+                "reached AS ("
+                "SELECT *, max(end_time) OVER ("
+                "PARTITION BY trace_id ORDER BY timestamp "
+                "ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING) AS previous_reach "
+                "FROM calls), "
+                "segmented AS ("
+                "SELECT *, sum(CASE WHEN previous_reach IS NULL "
+                "OR timestamp > previous_reach THEN 1 ELSE 0 END) OVER ("
+                "PARTITION BY trace_id ORDER BY timestamp ROWS UNBOUNDED PRECEDING"
+                ") AS segment FROM reached), "
+                "critical AS ("
+                "SELECT trace_id, sum(segment_ms) AS critical_path_ms FROM ("
+                "SELECT trace_id, date_diff('microsecond', min(timestamp), max(end_time)) "
+                "/ 1000.0 AS segment_ms FROM segmented GROUP BY trace_id, segment) "
+                "GROUP BY trace_id) "
+            )
+
+        summaries = self._query(
+            "WITH calls AS ("
+            "SELECT *, timestamp + to_microseconds("
+            "CAST(round(coalesce(call_duration, 0) * 1000) AS BIGINT)) AS end_time "
+            "FROM events WHERE trace_id IS NOT NULL), "
+            f"{critical_path_sql}"
+            "SELECT trace_id, "
+            "min(timestamp) AS start_time, "
+            "max(end_time) AS end_time, "
+            "any_value(critical.critical_path_ms) AS critical_path_ms, "
+            "count(DISTINCT transaction_id) AS span_count, "
+            "count(*) AS call_count, "
+            "list_sort(list_distinct(list_concat("
+            "list(service_name) FILTER (WHERE service_name IS NOT NULL), "
+            "list(callee) FILTER (WHERE callee IS NOT NULL)))) AS services, "
+            "count(*) FILTER (WHERE regexp_matches(event_code, ?, 'i')) AS error_calls "
+            "FROM calls JOIN critical USING (trace_id) "
+            "GROUP BY trace_id ORDER BY min(timestamp)",
+            [ERROR_EVENT_PATTERN],
+        )
+        summaries["services"] = summaries["services"].apply(
+            lambda services: tuple(services) if services is not None else ()
+        )
+        return finalize_trace_summaries(summaries)
+
+    def latency_rollup(
+        self,
+        resolution_seconds: int,
+        by_callee: bool = False,
+        start=None,
+        end=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        keys = "service_name, callee" if by_callee else "service_name"
+        callee_filter = " AND callee IS NOT NULL" if by_callee else ""
+        where, params = self._where(
+            start, end, service_name=service_name, callee=callee
+        )
+        where += " AND " if where else " WHERE "
+        return self._query(
+            f"SELECT {keys}, "
+            f"time_bucket(INTERVAL {int(resolution_seconds)} SECOND, timestamp) "
+            "AS bucket, count(*) AS calls, "
+            "quantile_cont(call_duration, 0.5) AS p50, "
+            "quantile_cont(call_duration, 0.95) AS p95 "
+            f"FROM {self._events(start, end, service_name)}{where}"
+            "service_name IS NOT NULL AND timestamp IS NOT NULL "
+            f"AND call_duration IS NOT NULL{callee_filter} "
+            f"GROUP BY ALL ORDER BY {keys}, bucket",
+            params,
+        )
+
+
+def open_backend(data_path: str, backend: str = "auto", columns=None) -> QueryBackend:
+    path = resolve_data_path(data_path)
+    if backend == "auto":
+        backend = "duckdb" if path.is_dir() or path.suffix == ".parquet" else "pandas"
+
+    if backend == "duckdb":
+        return DuckDBBackend(path)
+    if backend == "pandas":
+        return PandasBackend(load_data(str(path), columns=columns))
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKEND_CHOICES}")
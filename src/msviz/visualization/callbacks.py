@@ -1,23 +1,46 @@
 """Dash callback registrations."""
 
 import pandas as pd
-from dash import Input, Output, State
+from dash import Input, Output, State, ctx, no_update
+from dash.exceptions import PreventUpdate
 
+from .comparison import (
+    build_comparison_elements,
+    build_comparison_table,
+    compare_edges,
+    describe_comparison,
+)
+from .data import anomalous_edges
+from .element_delta import ElementSessions
 from .graphs import (
     build_all_event_code_histogram,
     build_edge_event_code_histogram,
     build_event_table,
+    build_latency_attribution_table,
     build_overall_graph_elements,
     build_selected_edge_violinplot,
     build_service_heatmap_figure,
     build_span_elements,
+    build_timeseries_figure,
     build_trace_elements,
-    get_global_incoming_range,
 )
+from .layout import build_sample_banner, describe_dataset, slider_marks, split_window
+from .rollups import RESOLUTIONS
+from .trace_index import build_trace_options, describe_trace_page, trace_page_count
+
 
+def register_callbacks(
+    app, datasets, overall_stylesheet, background=False, anomalies=None
+):
+    # Views that rescan the dataset on every slider change run as background
+    # callbacks when enabled. Dash terminates a still-running job as soon as
+    # the same callback is triggered again, so superseded requests are
+    # cancelled instead of queueing up behind each other.
+    heavy_callback = {"background": True} if background else {}
 
-def register_callbacks(app, data, overall_stylesheet):
-    global_min_count, global_max_count = get_global_incoming_range(data)
+    # Callbacks read the dataset from the holder on every call, so that a
+    # quick-look sample can be replaced by the full data while serving.
+    overall_sessions = ElementSessions()
 
     def _is_empty_figure(figure):
         return isinstance(figure, dict) and not figure
@@ -27,55 +50,186 @@ def register_callbacks(app, data, overall_stylesheet):
             Output("cytoscape-graph", "elements"),
             Output("cytoscape-graph", "stylesheet"),
             Output("event-table", "children"),
-            Output("overall-cytoscape-graph", "elements"),
+            Output("latency-attribution-table", "children"),
         ],
         [Input("trace-id-dropdown", "value"), Input("time-range-slider", "value")],
+        **heavy_callback,
     )
     def update_dashboard(selected_trace_id, time_range):
+        backend = datasets.current.backend
         start_dt = pd.to_datetime(time_range[0], unit="s")
         end_dt = pd.to_datetime(time_range[1], unit="s")
 
-        filtered_data = data[
-            (data["timestamp"] >= start_dt) & (data["timestamp"] <= end_dt)
-        ]
-
         if not selected_trace_id:
-            return [], overall_stylesheet, "No trace_id selected.", []
+            return [], overall_stylesheet, "No trace_id selected.", ""
 
-        df = filtered_data[filtered_data["trace_id"] == selected_trace_id]
+        df = backend.rows(start=start_dt, end=end_dt, trace_id=selected_trace_id)
 
         elements = build_trace_elements(df)
         table_html = build_event_table(df)
+        attribution_html = build_latency_attribution_table(df)
+
+        return elements, overall_stylesheet, table_html, attribution_html
+
+    # The overall graph keeps the same nodes and edges between most updates;
+    # only colours, call-count labels and the selected classes change, so
+    # clients are sent a patch against the elements they already hold. It
+    # stays a regular callback so the per-session state lives in this process.
+    @app.callback(
+        [
+            Output("overall-cytoscape-graph", "elements"),
+            Output("overall-graph-sync", "data"),
+        ],
+        [Input("trace-id-dropdown", "value"), Input("time-range-slider", "value")],
+        State("overall-graph-sync", "data"),
+    )
+    def update_overall_graph(selected_trace_id, time_range, sync):
+        dataset = datasets.current
+        start_dt = pd.to_datetime(time_range[0], unit="s")
+        end_dt = pd.to_datetime(time_range[1], unit="s")
+
+        if not selected_trace_id:
+            return overall_sessions.update(sync, [])
+
+        df = dataset.backend.rows(
+            start=start_dt, end=end_dt, trace_id=selected_trace_id
+        )
         overall_elements = build_overall_graph_elements(
-            filtered_data, global_min_count, global_max_count, selected_trace_id
+            dataset.backend.edge_counts(start_dt, end_dt),
+            *dataset.incoming_range,
+            df,
+            dataset.positions,
+            anomalous_edges(anomalies, start_dt, end_dt),
         )
+        return overall_sessions.update(sync, overall_elements)
 
-        return elements, overall_stylesheet, table_html, overall_elements
+    # The tooltip follows the handles while dragging, so it is formatted in
+    # the browser rather than costing a server round trip per drag step. The
+    # heavy views only react to `value`, which the slider commits on release.
+    app.clientside_callback(
+        """
+        function(dragValue, value) {
+            const [start, end] = (dragValue || value).map(
+                (seconds) => new Date(seconds * 1000).toISOString().slice(0, 19)
+                    .replace("T", " ")
+            );
+            return `${start}  to  ${end}`;
+        }
+        """,
+        Output("slider-tooltip", "children"),
+        Input("time-range-slider", "drag_value"),
+        State("time-range-slider", "value"),
+    )
 
     @app.callback(
-        Output("slider-tooltip", "children"), Input("time-range-slider", "value")
+        [
+            Output("dataset-version", "data"),
+            Output("dataset-poll", "disabled"),
+            Output("sample-banner", "children"),
+            Output("dataset-summary", "children"),
+            Output("time-range-slider", "min"),
+            Output("time-range-slider", "max"),
+            Output("time-range-slider", "marks"),
+            Output("time-range-slider", "value"),
+            Output("service-name-dropdown", "options"),
+            Output("trace-service-filter", "options"),
+            Output("timeseries-service-dropdown", "options"),
+        ],
+        Input("dataset-poll", "n_intervals"),
+        [State("dataset-version", "data"), State("time-range-slider", "value")],
+        prevent_initial_call=True,
     )
-    def update_slider_tooltip(value):
-        start = pd.to_datetime(value[0], unit="s").strftime("%Y-%m-%d %H:%M:%S")
-        end = pd.to_datetime(value[1], unit="s").strftime("%Y-%m-%d %H:%M:%S")
-        return f"{start}  to  {end}"
+    def swap_in_full_dataset(_n_intervals, version, time_range):
+        dataset, current_version, loading = datasets.snapshot()
+        if current_version == version:
+            if loading:
+                raise PreventUpdate
+            # The background load failed: keep the sample and stop polling.
+            banner = build_sample_banner(dataset.sample)
+            return (version, True, banner, *[no_update] * 8)
+
+        context = dataset.context
+        # Keep the selected window; setting the value also re-renders every
+        # view from the new dataset.
+        low = max(time_range[0], context.min_timestamp)
+        high = min(time_range[1], context.max_timestamp)
+        if low > high:
+            low, high = context.min_timestamp, context.max_timestamp
+        service_options = [
+            {"label": name, "value": name} for name in context.service_names
+        ]
+        return (
+            current_version,
+            not loading,
+            build_sample_banner(dataset.sample, loading),
+            describe_dataset(context),
+            context.min_timestamp,
+            context.max_timestamp,
+            slider_marks(context),
+            [low, high],
+            service_options,
+            service_options,
+            service_options,
+        )
 
     @app.callback(
         Output("event-code-histogram", "figure"),
-        Input("overall-cytoscape-graph", "tapEdgeData"),
+        [
+            Input("overall-cytoscape-graph", "tapEdgeData"),
+            Input("dataset-version", "data"),
+        ],
+    )
+    def update_event_code_histogram(_edge_data, _version):
+        backend = datasets.current.backend
+        return build_all_event_code_histogram(backend.event_code_counts())
+
+    @app.callback(
+        Output("trace-pagination", "active_page"),
+        [
+            Input("trace-id-dropdown", "search_value"),
+            Input("trace-service-filter", "value"),
+        ],
+        prevent_initial_call=True,
+    )
+    def reset_trace_page(_search_value, _service):
+        return 1
+
+    @app.callback(
+        [
+            Output("trace-id-dropdown", "options"),
+            Output("trace-pagination", "max_value"),
+            Output("trace-search-summary", "children"),
+        ],
+        [
+            Input("trace-id-dropdown", "search_value"),
+            Input("trace-service-filter", "value"),
+            Input("trace-pagination", "active_page"),
+            Input("dataset-version", "data"),
+        ],
+        State("trace-id-dropdown", "value"),
+        prevent_initial_call=True,
     )
-    def update_event_code_histogram(_edge_data):
-        return build_all_event_code_histogram(data)
+    def update_trace_options(
+        search_value, service, active_page, _version, selected_trace_id
+    ):
+        dataset = datasets.current
+        page = active_page or 1
+        if ctx.triggered_id != "trace-pagination":
+            page = 1
+        options, total = build_trace_options(
+            dataset.trace_index, search_value, service, page, selected_trace_id
+        )
+        return options, trace_page_count(total), describe_trace_page(page, total)
 
     @app.callback(
         Output("span-id-dropdown", "options"), Input("trace-id-dropdown", "value")
     )
     def update_span_id_dropdown(selected_trace_id):
+        backend = datasets.current.backend
         if not selected_trace_id:
             return []
 
-        filtered_df = data[data["trace_id"] == selected_trace_id]
-        span_ids = filtered_df["transaction_id"].dropna().unique()
+        span_ids = backend.span_ids(selected_trace_id)
         return [
             {
                 "label": (
@@ -93,19 +247,17 @@ def register_callbacks(app, data, overall_stylesheet):
             Output("span-event-table", "children"),
         ],
         [Input("span-id-dropdown", "value"), Input("time-range-slider", "value")],
+        **heavy_callback,
     )
     def update_span_graph(selected_span_id, time_range):
+        backend = datasets.current.backend
         if not selected_span_id:
             return [], overall_stylesheet, "No span_id selected."
 
         start_dt = pd.to_datetime(time_range[0], unit="s")
         end_dt = pd.to_datetime(time_range[1], unit="s")
 
-        df = data[
-            (data["transaction_id"] == selected_span_id)
-            & (data["timestamp"] >= start_dt)
-            & (data["timestamp"] <= end_dt)
-        ].copy()
+        df = backend.rows(start=start_dt, end=end_dt, transaction_id=selected_span_id)
 
         if df.empty:
             return [], overall_stylesheet, "No data for selected span."
@@ -117,14 +269,152 @@ def register_callbacks(app, data, overall_stylesheet):
     @app.callback(
         Output("heatmap-graph", "figure"),
         [Input("service-name-dropdown", "value"), Input("time-range-slider", "value")],
+        **heavy_callback,
     )
     def update_heatmap(selected_service, time_range):
+        backend = datasets.current.backend
         start_dt = pd.to_datetime(time_range[0], unit="s")
         end_dt = pd.to_datetime(time_range[1], unit="s")
-        filtered_data = data[
-            (data["timestamp"] >= start_dt) & (data["timestamp"] <= end_dt)
+        if not selected_service:
+            return {}
+        cells = backend.heatmap_cells(selected_service, start_dt, end_dt)
+        return build_service_heatmap_figure(cells, selected_service)
+
+    @app.callback(
+        [
+            Output("timeseries-callee-dropdown", "options"),
+            Output("timeseries-callee-dropdown", "value"),
+        ],
+        Input("timeseries-service-dropdown", "value"),
+    )
+    def update_timeseries_callees(selected_service):
+        dataset = datasets.current
+        callees = dataset.edge_counts.loc[
+            dataset.edge_counts["service_name"] == selected_service, "callee"
         ]
-        return build_service_heatmap_figure(filtered_data, selected_service)
+        return [{"label": name, "value": name} for name in sorted(callees)], None
+
+    # Rollups are read from memory, so this view stays a regular callback
+    # and the tables are built once in this process.
+    @app.callback(
+        Output("timeseries-graph", "figure"),
+        [
+            Input("timeseries-service-dropdown", "value"),
+            Input("timeseries-callee-dropdown", "value"),
+            Input("time-range-slider", "value"),
+        ],
+    )
+    def update_timeseries(selected_service, selected_callee, time_range):
+        dataset = datasets.current
+        if not selected_service:
+            return {}
+        start_dt = pd.to_datetime(time_range[0], unit="s")
+        end_dt = pd.to_datetime(time_range[1], unit="s")
+        resolution, series = dataset.rollups.series(
+            selected_service, start_dt, end_dt, callee=selected_callee
+        )
+        title = (
+            f"{selected_service} -> {selected_callee}"
+            if selected_callee
+            else f"{selected_service} (all callees)"
+        )
+        return build_timeseries_figure(
+            series, resolution, RESOLUTIONS[resolution], title
+        )
+
+    @app.callback(
+        [
+            Output("compare-trace-controls", "style"),
+            Output("compare-window-controls", "style"),
+        ],
+        Input("compare-mode", "value"),
+    )
+    def toggle_compare_controls(mode):
+        hidden = {"display": "none"}
+        if mode == "windows":
+            return hidden, {}
+        return {"marginBottom": "10px"}, hidden
+
+    for side in "ab":
+
+        @app.callback(
+            Output(f"compare-trace-{side}", "options"),
+            [
+                Input(f"compare-trace-{side}", "search_value"),
+                Input("dataset-version", "data"),
+            ],
+            State(f"compare-trace-{side}", "value"),
+            prevent_initial_call=True,
+        )
+        def update_compare_trace_options(search_value, _version, selected_trace_id):
+            options, _ = build_trace_options(
+                datasets.current.trace_index,
+                search_value,
+                selected_trace_id=selected_trace_id,
+            )
+            return options
+
+    @app.callback(
+        [
+            Output("compare-window-a", "min"),
+            Output("compare-window-a", "max"),
+            Output("compare-window-a", "marks"),
+            Output("compare-window-a", "value"),
+            Output("compare-window-b", "min"),
+            Output("compare-window-b", "max"),
+            Output("compare-window-b", "marks"),
+            Output("compare-window-b", "value"),
+        ],
+        Input("dataset-version", "data"),
+        prevent_initial_call=True,
+    )
+    def reset_compare_windows(_version):
+        context = datasets.current.context
+        bounds = (context.min_timestamp, context.max_timestamp, slider_marks(context))
+        window_a, window_b = split_window(context)
+        return (*bounds, window_a, *bounds, window_b)
+
+    # Both sides are reduced to per-edge aggregates by the backend, so the
+    # diff and the graph only ever touch edges and this stays a regular
+    # callback.
+    @app.callback(
+        [
+            Output("compare-cytoscape-graph", "elements"),
+            Output("compare-summary", "children"),
+            Output("compare-table", "children"),
+        ],
+        [
+            Input("compare-mode", "value"),
+            Input("compare-trace-a", "value"),
+            Input("compare-trace-b", "value"),
+            Input("compare-window-a", "value"),
+            Input("compare-window-b", "value"),
+        ],
+    )
+    def update_comparison(mode, trace_a, trace_b, window_a, window_b):
+        dataset = datasets.current
+        if mode == "windows":
+            baseline, candidate = (
+                dataset.backend.edge_latency(
+                    pd.to_datetime(window[0], unit="s"),
+                    pd.to_datetime(window[1], unit="s"),
+                )
+                for window in (window_a, window_b)
+            )
+        else:
+            if not trace_a or not trace_b:
+                return [], "Select two trace_ids to compare.", None
+            baseline = dataset.backend.edge_latency(trace_id=trace_a)
+            candidate = dataset.backend.edge_latency(trace_id=trace_b)
+
+        diff = compare_edges(baseline, candidate)
+        if diff.empty:
+            return [], describe_comparison(diff), None
+        return (
+            build_comparison_elements(diff, dataset.positions),
+            describe_comparison(diff),
+            build_comparison_table(diff),
+        )
 
     @app.callback(
         [
@@ -135,11 +425,13 @@ def register_callbacks(app, data, overall_stylesheet):
         [State("edge-histogram-modal", "is_open")],
     )
     def show_edge_histogram(edge_data, is_open):
+        backend = datasets.current.backend
         _ = is_open
         if edge_data:
             source = edge_data["source"]
             target = edge_data["target"]
-            fig = build_edge_event_code_histogram(data, source, target)
+            event_counts = backend.event_code_counts(service_name=source, callee=target)
+            fig = build_edge_event_code_histogram(event_counts, source, target)
             if not _is_empty_figure(fig):
                 return True, fig
         return False, {}
@@ -156,6 +448,7 @@ def register_callbacks(app, data, overall_stylesheet):
     def show_selected_edge_violinplot(
         edge_data, is_open, selected_trace_id, time_range
     ):
+        backend = datasets.current.backend
         _ = is_open
         if edge_data and selected_trace_id:
             source = edge_data["source"]
@@ -163,13 +456,13 @@ def register_callbacks(app, data, overall_stylesheet):
             start_dt = pd.to_datetime(time_range[0], unit="s")
             end_dt = pd.to_datetime(time_range[1], unit="s")
 
-            filtered_df = data[
-                (data["trace_id"] == selected_trace_id)
-                & (data["service_name"] == source)
-                & (data["callee"] == target)
-                & (data["timestamp"] >= start_dt)
-                & (data["timestamp"] <= end_dt)
-            ]
+            filtered_df = backend.rows(
+                start=start_dt,
+                end=end_dt,
+                trace_id=selected_trace_id,
+                service_name=source,
+                callee=target,
+            )
             fig = build_selected_edge_violinplot(filtered_df, source, target)
             if not _is_empty_figure(fig):
                 return True, fig
@@ -0,0 +1,151 @@
+"""Per-edge differences between two traces or two time windows."""
+
+from functools import cache
+
+import dash_bootstrap_components as dbc
+import matplotlib.cm as cm
+import matplotlib.colors as mcolors
+import numpy as np
+import pandas as pd
+
+from .graphs import service_graph_positions
+
+EDGE_KEYS = ["service_name", "callee"]
+# Relative latency change at which the diff colours saturate.
+MAX_COLOURED_CHANGE = 1.0
+
+
+def compare_edges(baseline: pd.DataFrame, candidate: pd.DataFrame) -> pd.DataFrame:
+    """Count and mean latency deltas per edge of two ``edge_latency`` frames.
+
+    Both sides are already aggregated per edge, so the comparison is one
+    outer merge and a few column operations: its cost grows with the number
+    of edges, however many rows the traces or windows cover.
+    """
+    merged = baseline.merge(
+        candidate, on=EDGE_KEYS, how="outer", suffixes=("_a", "_b"), indicator=True
+    )
+    calls_a = merged["calls_a"].fillna(0).astype(np.int64)
+    calls_b = merged["calls_b"].fillna(0).astype(np.int64)
+    latency_delta = merged["mean_duration_b"] - merged["mean_duration_a"]
+    status = np.select(
+        [merged["_merge"] == "left_only", merged["_merge"] == "right_only"],
+        ["removed", "added"],
+        "changed",
+    )
+    return pd.DataFrame(
+        {
+            "service_name": merged["service_name"],
+            "callee": merged["callee"],
+            "status": status,
+            "calls_a": calls_a,
+            "calls_b": calls_b,
+            "call_delta": calls_b - calls_a,
+            "latency_a": merged["mean_duration_a"],
+            "latency_b": merged["mean_duration_b"],
+            "latency_delta": latency_delta,
+            "latency_change": latency_delta / merged["mean_duration_a"].replace(0, np.nan),
+        }
+    )
+
+
+@cache
+def _diff_palette() -> np.ndarray:
+    # Quantized once, so colouring an edge is an array lookup.
+    colours = cm.get_cmap("coolwarm")(np.linspace(0, 1, 256))
+    return np.array([mcolors.rgb2hex(colour) for colour in colours])
+
+
+def _signed(values: pd.Series, decimals: int = 0) -> pd.Series:
+    values = values.fillna(0).round(decimals)
+    if decimals == 0:
+        values = values.astype(np.int64)
+    signs = pd.Series(np.where(values < 0, "", "+"), index=values.index)
+    return signs + values.astype(str)
+
+
+def build_comparison_elements(diff: pd.DataFrame, positions: dict | None = None):
+    """Cytoscape elements with edges coloured by their latency change.
+
+    Edges that got slower are red and faster ones blue, saturating at
+    ``MAX_COLOURED_CHANGE``; edges on one side only get the ``added`` or
+    ``removed`` class.
+    """
+    nodes = set(diff["service_name"]).union(set(diff["callee"]))
+    if positions is None or not nodes.issubset(positions):
+        positions = service_graph_positions(diff)
+
+    cy_nodes = [
+        {"data": {"id": node, "label": node}, "position": positions[node]}
+        for node in sorted(nodes)
+    ]
+
+    change = diff["latency_change"].fillna(0).clip(
+        -MAX_COLOURED_CHANGE, MAX_COLOURED_CHANGE
+    )
+    shade = np.rint((change.to_numpy() / MAX_COLOURED_CHANGE + 1) * 127.5)
+    colours = _diff_palette()[shade.astype(np.int64)]
+    percent = (" (" + _signed(diff["latency_change"] * 100) + "%)").where(
+        diff["latency_change"].notna(), ""
+    )
+    labels = (
+        "Calls: "
+        + _signed(diff["call_delta"])
+        + ", "
+        + _signed(diff["latency_delta"], 1)
+        + "ms"
+        + percent
+    )
+    # One-sided edges have no latency delta; label them with what they had.
+    one_sided = diff["status"] != "changed"
+    labels[one_sided] = (
+        diff["status"][one_sided]
+        + ": "
+        + (diff["calls_a"] + diff["calls_b"])[one_sided].astype(str)
+        + " calls"
+    )
+
+    cy_edges = [
+        {
+            "data": {"source": source, "target": target, "label": label},
+            "classes": status if status != "changed" else "",
+            "style": {"line-color": colour, "target-arrow-color": colour}
+            if status == "changed"
+            else {},
+        }
+        for source, target, status, label, colour in zip(
+            diff["service_name"], diff["callee"], diff["status"], labels, colours
+        )
+    ]
+    return cy_nodes + cy_edges
+
+
+def describe_comparison(diff: pd.DataFrame) -> str:
+    if diff.empty:
+        return "Neither side has any calls between services."
+    counts = diff["status"].value_counts()
+    return (
+        f"{counts.get('changed', 0)} edges on both sides, "
+        f"{counts.get('added', 0)} only in the comparison (green, dashed), "
+        f"{counts.get('removed', 0)} only in the baseline (grey, dotted). "
+        "Edges that got slower are red and faster ones blue; "
+        f"the colour saturates at ±{MAX_COLOURED_CHANGE:.0%}."
+    )
+
+
+def build_comparison_table(diff: pd.DataFrame, limit: int = 20):
+    top = diff.loc[
+        diff["latency_delta"].abs().sort_values(ascending=False).index[:limit]
+    ]
+    table_df = pd.DataFrame(
+        {
+            "service": top["service_name"],
+            "callee": top["callee"],
+            "calls (baseline)": top["calls_a"],
+            "calls (comparison)": top["calls_b"],
+            "mean ms (baseline)": top["latency_a"].round(1),
+            "mean ms (comparison)": top["latency_b"].round(1),
+            "change (ms)": top["latency_delta"].round(1),
+        }
+    )
+    return dbc.Table.from_dataframe(table_df, striped=True, bordered=True, hover=True)
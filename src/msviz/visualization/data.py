@@ -5,11 +5,13 @@ from pathlib import Path
 
 import pandas as pd
 
+from ..partitions import read_manifest, select_partitions
+from ..preprocessing.anomalies import anomalies_path
+
 
 @dataclass(frozen=True)
 class DataContext:
     num_records: int
-    trace_ids: list
     service_names: list
     first_timestamp: str
     last_timestamp: str
@@ -17,8 +19,8 @@ class DataContext:
     max_timestamp: int
 
 
-def load_data(csv_path: str = "data/processed_data.csv") -> pd.DataFrame:
-    path = Path(csv_path)
+def resolve_data_path(data_path: str = "data/processed_data.csv") -> Path:
+    path = Path(data_path)
     if not path.is_absolute() and not path.exists():
         file_path = Path(__file__).resolve()
         project_root = file_path.parents[3]
@@ -34,27 +36,158 @@ def load_data(csv_path: str = "data/processed_data.csv") -> pd.DataFrame:
             if candidate.exists():
                 path = candidate
                 break
+    return path
+
+
+# Columns read by the dashboard views; anything else in the processed data
+# (raw messages, parsed payloads, providers) is never displayed.
+DASHBOARD_COLUMNS = (
+    "timestamp",
+    "service_name",
+    "callee",
+    "event_code",
+    "trace_id",
+    "transaction_id",
+    "call_duration",
+    "call_depth",
+    "self_duration",
+    "child_duration",
+    "critical_path",
+)
+
+
+def _parquet_columns(path: Path, columns) -> list | None:
+    if columns is None:
+        return None
+    import pyarrow.parquet as pq
+
+    present = set(pq.read_schema(path).names)
+    return [column for column in columns if column in present]
 
-    data = pd.read_csv(path)
-    data["call_duration"] = pd.to_numeric(data["call_duration"] * 1000, errors="coerce")
-    data["timestamp"] = pd.to_datetime(
-        data["timestamp"], format="%Y-%m-%d %H:%M:%S:%f", errors="coerce"
+
+def _read_partitioned(root: Path, start=None, end=None, columns=None) -> pd.DataFrame:
+    partitions = read_manifest(root)
+    if not partitions:
+        data = pd.read_parquet(root)
+        return data if columns is None else data[[c for c in columns if c in data]]
+
+    selected = select_partitions(partitions, start, end)
+    if not selected:
+        first = root / partitions[0].path
+        return pd.read_parquet(first, columns=_parquet_columns(first, columns)).iloc[0:0]
+    files = [root / partition.path for partition in selected]
+    return pd.concat(
+        [pd.read_parquet(file, columns=_parquet_columns(file, columns)) for file in files],
+        ignore_index=True,
     )
+
+
+def _parse_timestamps(timestamps: pd.Series) -> pd.Series:
+    if timestamps.dtype != object:
+        return pd.to_datetime(timestamps, errors="coerce")
+    # "%H:%M:%S:%f" misses pandas' fast ISO parser; writing the fraction
+    # separator as "." first parses the same values several times faster.
+    iso = timestamps.str.slice(0, 19) + "." + timestamps.str.slice(20)
+    return pd.to_datetime(iso, format="ISO8601", errors="coerce")
+
+
+def normalize_processed(data: pd.DataFrame) -> pd.DataFrame:
+    """Convert durations to milliseconds and parse timestamps in place."""
+    for column in ("call_duration", "self_duration", "child_duration"):
+        if column in data:
+            data[column] = pd.to_numeric(data[column] * 1000, errors="coerce")
+    data["timestamp"] = _parse_timestamps(data["timestamp"])
     return data
 
 
+def load_data(
+    csv_path: str = "data/processed_data.csv", start=None, end=None, columns=None
+) -> pd.DataFrame:
+    """Load processed data, optionally reading only ``columns``."""
+    path = resolve_data_path(csv_path)
+    if path.is_dir():
+        data = _read_partitioned(path, start, end, columns)
+    elif path.suffix == ".parquet":
+        data = pd.read_parquet(path, columns=_parquet_columns(path, columns))
+    else:
+        usecols = None if columns is None else (lambda column: column in columns)
+        data = pd.read_csv(path, usecols=usecols)
+    data = normalize_processed(data)
+    if start is not None:
+        data = data[data["timestamp"] >= start]
+    if end is not None:
+        data = data[data["timestamp"] <= end]
+    return data
+
+
+def iter_data_batches(
+    csv_path: str = "data/processed_data.csv",
+    columns=None,
+    batch_rows: int = 100_000,
+    normalize: bool = True,
+):
+    """Yield processed data in batches of about ``batch_rows`` rows.
+
+    With ``normalize=False`` the batches are yielded as read, so that callers
+    can drop rows before paying for the timestamp parsing.
+    """
+    path = resolve_data_path(csv_path)
+    finish = normalize_processed if normalize else (lambda batch: batch)
+    if path.is_dir() or path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        files = [path]
+        if path.is_dir():
+            partitions = read_manifest(path)
+            files = (
+                [path / partition.path for partition in partitions]
+                if partitions
+                else sorted(path.glob("**/*.parquet"))
+            )
+        for file in files:
+            parquet = pq.ParquetFile(file)
+            for batch in parquet.iter_batches(
+                batch_size=batch_rows, columns=_parquet_columns(file, columns)
+            ):
+                yield finish(batch.to_pandas())
+        return
+    usecols = None if columns is None else (lambda column: column in columns)
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=batch_rows):
+        yield finish(chunk)
+
+
 def build_context(data: pd.DataFrame) -> DataContext:
     min_ts = data["timestamp"].min()
     max_ts = data["timestamp"].max()
-    trace_ids = data["trace_id"].dropna().unique().tolist()
     service_names = sorted(data["service_name"].dropna().unique().tolist())
 
     return DataContext(
         num_records=len(data),
-        trace_ids=trace_ids,
         service_names=service_names,
         first_timestamp=min_ts.strftime("%Y-%m-%d %H:%M:%S"),
         last_timestamp=max_ts.strftime("%Y-%m-%d %H:%M:%S"),
         min_timestamp=int(min_ts.timestamp()),
         max_timestamp=int(max_ts.timestamp()),
     )
+
+
+def load_anomalies(data_path: str = "data/processed_data.csv") -> pd.DataFrame | None:
+    path = anomalies_path(resolve_data_path(data_path))
+    if not path.exists():
+        return None
+    anomalies = pd.read_csv(path, parse_dates=["window_start", "window_end"])
+    for column in ("median_duration", "baseline_duration"):
+        anomalies[column] = anomalies[column] * 1000
+    return anomalies
+
+
+def anomalous_edges(anomalies: pd.DataFrame | None, start=None, end=None) -> set:
+    if anomalies is None:
+        return set()
+    overlapping = pd.Series(True, index=anomalies.index)
+    if start is not None:
+        overlapping &= anomalies["window_end"] >= start
+    if end is not None:
+        overlapping &= anomalies["window_start"] <= end
+    flagged = anomalies[overlapping]
+    return set(zip(flagged["service_name"], flagged["callee"]))
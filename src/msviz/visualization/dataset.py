@@ -0,0 +1,104 @@
+"""The dataset behind the dashboard, replaceable while the app is running."""
+
+import logging
+import threading
+from dataclasses import dataclass
+from functools import cached_property
+
+from .backends import PandasBackend, QueryBackend, open_backend
+from .data import DASHBOARD_COLUMNS, DataContext
+from .graphs import get_global_incoming_range, service_graph_positions
+from .query_plan import QueryPlan
+from .rollups import LatencyRollups
+from .sampling import SampleInfo, load_sample
+from .trace_index import TraceIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    backend: QueryBackend
+    context: DataContext
+    trace_index: TraceIndex
+    # Set when the backend holds a quick-look sample rather than all rows.
+    sample: SampleInfo | None = None
+
+    @cached_property
+    def edge_counts(self):
+        return self.backend.edge_counts()
+
+    @cached_property
+    def incoming_range(self) -> tuple:
+        return get_global_incoming_range(self.edge_counts)
+
+    @cached_property
+    def positions(self) -> dict:
+        # Positions come from the full service graph, so every time window
+        # shows its services in the same place and the client runs no layout.
+        return service_graph_positions(self.edge_counts)
+
+    @cached_property
+    def rollups(self) -> LatencyRollups:
+        return LatencyRollups(self.backend)
+
+
+def _dataset(backend: QueryBackend, sample: SampleInfo | None = None) -> Dataset:
+    plan = QueryPlan(backend)
+    return Dataset(plan, plan.build_context(), TraceIndex(plan.trace_summaries()), sample)
+
+
+def open_dataset(data_path: str, backend: str = "auto", columns=None) -> Dataset:
+    return _dataset(open_backend(data_path, backend, columns))
+
+
+def open_sample(
+    data_path: str, mode: str, max_rows: int, bucket: str = "1min"
+) -> Dataset:
+    sample, info = load_sample(data_path, mode, max_rows, bucket)
+    return _dataset(PandasBackend(sample), info)
+
+
+class DatasetHolder:
+    """Points the callbacks at the current dataset.
+
+    Quick-look mode starts on a sample and can load the full data on a
+    background thread; ``version`` changes when it is swapped in, which the
+    page polls for to refresh the controls built from the old dataset.
+    """
+
+    def __init__(self, dataset: Dataset):
+        self.current = dataset
+        self.version = 0
+        self.loading = False
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> tuple[Dataset, int, bool]:
+        """The current dataset, its version and whether a load is running."""
+        with self._lock:
+            return self.current, self.version, self.loading
+
+    def swap(self, dataset: Dataset) -> None:
+        with self._lock:
+            self.current = dataset
+            self.version += 1
+            self.loading = False
+
+    def load_in_background(self, data_path: str, backend: str = "auto") -> None:
+        def load():
+            try:
+                dataset = open_dataset(data_path, backend, DASHBOARD_COLUMNS)
+                # Warm the shared aggregates before the swap so the first
+                # interaction on the full data does not pay for them.
+                dataset.positions
+            except Exception:
+                logger.exception("Loading the full dataset from %s failed", data_path)
+                with self._lock:
+                    self.loading = False
+                return
+            self.swap(dataset)
+            logger.info("Full dataset loaded: %d rows", dataset.context.num_records)
+
+        with self._lock:
+            self.loading = True
+        threading.Thread(target=load, name="full-dataset-loader", daemon=True).start()
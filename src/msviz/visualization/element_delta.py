@@ -0,0 +1,110 @@
+"""Delta updates for Cytoscape element lists, tracked per browser session."""
+
+import json
+import threading
+import uuid
+from collections import OrderedDict
+
+from dash import Patch
+
+
+def element_key(element: dict) -> tuple:
+    data = element["data"]
+    if "source" in data:
+        return ("edge", data["source"], data["target"])
+    return ("node", data["id"])
+
+
+def diff_elements(previous: list, elements: list) -> tuple[Patch, list] | None:
+    """Patch turning ``previous`` into an element list equal to ``elements``.
+
+    Elements are matched by node id or edge endpoints. Changed elements are
+    updated in place, down to single keys of ``data`` and ``style``; removed
+    ones are deleted and new ones appended. Returns the patch and the element
+    list the client holds once it is applied, which is ``elements`` in a
+    possibly different order, or None when most elements changed and the
+    full list is the smaller update.
+    """
+    current = {element_key(element): element for element in elements}
+    patch = Patch()
+    removed = []
+    kept = []
+    changed = 0
+    for index, old in enumerate(previous):
+        new = current.pop(element_key(old), None)
+        if new is None:
+            removed.append(index)
+            continue
+        kept.append(new)
+        if new != old:
+            changed += 1
+            _patch_dict(patch[index], old, new, nested=True)
+
+    added = list(current.values())
+    if 2 * (changed + len(added)) > len(elements):
+        return None
+    # Deleting from the back keeps the indices of earlier deletions valid.
+    for index in reversed(removed):
+        del patch[index]
+    if added:
+        patch.extend(added)
+    return patch, kept + added
+
+
+def _patch_dict(patch, old: dict, new: dict, nested: bool) -> None:
+    for key in old.keys() - new.keys():
+        del patch[key]
+    for key, value in new.items():
+        old_value = old.get(key)
+        if old_value == value:
+            continue
+        if nested and isinstance(old_value, dict) and isinstance(value, dict):
+            _patch_dict(patch[key], old_value, value, nested=False)
+        else:
+            patch[key] = value
+
+
+class ElementSessions:
+    """Last element list sent to each session, bounded by an LRU.
+
+    The client echoes back the session id and version it last received. A
+    delta is only sent when that version is the one stored here; a client
+    that missed an update, an evicted session or a restarted server get the
+    full list instead. Sessions are evicted oldest first once there are more
+    than ``max_sessions`` or the stored lists exceed ``max_bytes`` as JSON.
+    """
+
+    def __init__(self, max_sessions: int = 256, max_bytes: int = 16 << 20):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict = OrderedDict()
+        self._bytes = 0
+
+    def update(self, sync: dict | None, elements: list) -> tuple:
+        session = (sync or {}).get("session") or uuid.uuid4().hex
+        client_version = (sync or {}).get("version")
+        size = len(json.dumps(elements, separators=(",", ":"), default=str))
+        with self._lock:
+            version, previous, stored_size = self._sessions.pop(session, (0, None, 0))
+            self._bytes -= stored_size
+            delta = None
+            # Clearing the graph is a full update: [] is smaller than deletes.
+            if previous is not None and elements and client_version == version:
+                delta = diff_elements(previous, elements)
+            output = elements
+            if delta is not None:
+                output, elements = delta
+            version += 1
+            # A list larger than the whole budget is not kept, so that
+            # session gets full updates.
+            if size > self.max_bytes:
+                elements, size = None, 0
+            self._sessions[session] = (version, elements, size)
+            self._bytes += size
+            while (
+                len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._sessions.popitem(last=False)
+                self._bytes -= evicted_size
+        return output, {"session": session, "version": version}
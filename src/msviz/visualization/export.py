@@ -0,0 +1,232 @@
+"""Headless export of dashboard views to JSON or HTML files."""
+
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+from plotly.offline import get_plotlyjs
+
+from .backends import open_backend
+from .data import anomalous_edges, load_anomalies
+from .graphs import (
+    build_edge_event_code_histogram,
+    build_overall_graph_elements,
+    build_service_heatmap_figure,
+    get_global_incoming_range,
+    service_graph_positions,
+)
+from .styles import overall_stylesheet
+
+EXPORT_FORMATS = ("json", "html")
+CYTOSCAPE_JS_URL = "https://unpkg.com/cytoscape@3.30.2/dist/cytoscape.min.js"
+_GRAPH_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{script}"></script>
+</head>
+<body style="margin: 0">
+<div id="graph" style="width: 100vw; height: 100vh"></div>
+<script>
+cytoscape({{
+  container: document.getElementById("graph"),
+  elements: {elements},
+  style: {stylesheet},
+  layout: {{name: "preset", padding: 10}}
+}});
+</script>
+</body>
+</html>
+"""
+
+# Aggregates and settings of the running export, set once per worker process.
+_tables: dict = {}
+
+
+@dataclass(frozen=True)
+class ExportResult:
+    output_dir: Path
+    views: int
+    heatmaps: int
+    edge_histograms: int
+    seconds: float
+
+    @property
+    def views_per_second(self) -> float:
+        return self.views / self.seconds if self.seconds else float("inf")
+
+
+def _file_name(name: str) -> str:
+    # Percent-encoding keeps any service name a single, reversible file name.
+    return quote(str(name), safe="")
+
+
+def _init_worker(tables: dict) -> None:
+    # Under fork the tables are inherited rather than pickled, so every
+    # worker shares the aggregates built once by the parent.
+    _tables.clear()
+    _tables.update(tables)
+
+
+def _write_figure(fig, path: Path, fmt: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "html":
+        # All pages load the one plotly.min.js at the export root.
+        depth = len(path.relative_to(_tables["output_dir"]).parts) - 1
+        fig.write_html(path, include_plotlyjs="../" * depth + "plotly.min.js")
+    else:
+        path.write_text(fig.to_json())
+
+
+def _export_view(kind: str, key) -> dict | None:
+    output_dir = _tables["output_dir"]
+    fmt = _tables["format"]
+    if kind == "heatmap":
+        fig = build_service_heatmap_figure(_tables["heatmap"][key], key)
+        path = output_dir / "heatmaps" / f"{_file_name(key)}.{fmt}"
+        entry = {"kind": kind, "service_name": key}
+    else:
+        source, target = key
+        fig = build_edge_event_code_histogram(_tables["edge"][key], source, target)
+        path = (
+            output_dir
+            / "edge_histograms"
+            / _file_name(source)
+            / f"{_file_name(target)}.{fmt}"
+        )
+        entry = {"kind": kind, "service_name": source, "callee": target}
+    if isinstance(fig, dict) and not fig:
+        return None
+    _write_figure(fig, path, fmt)
+    return {**entry, "path": path.relative_to(output_dir).as_posix()}
+
+
+def _export_chunk(tasks: list) -> list[dict]:
+    return [entry for kind, key in tasks if (entry := _export_view(kind, key))]
+
+
+def _write_overall_graph(elements: list, output_dir: Path, fmt: str) -> str:
+    if fmt == "html":
+        path = output_dir / "overall_graph.html"
+        path.write_text(
+            _GRAPH_HTML.format(
+                title="Overall Service to Callee Service Graph",
+                script=CYTOSCAPE_JS_URL,
+                elements=json.dumps(elements),
+                stylesheet=json.dumps(overall_stylesheet),
+            )
+        )
+    else:
+        path = output_dir / "overall_graph.json"
+        path.write_text(
+            json.dumps({"elements": elements, "stylesheet": overall_stylesheet})
+        )
+    return path.name
+
+
+def export_views(
+    data_path: str,
+    output_dir: str,
+    start=None,
+    end=None,
+    fmt: str = "json",
+    workers: int | None = None,
+    backend: str = "auto",
+) -> ExportResult:
+    """Render the overall graph, per-service heatmaps and per-edge histograms.
+
+    The backend reduces the time window to heatmap cells per service and
+    event code counts per edge with two grouped queries. The per-view
+    figures are then built and written by ``workers`` processes (all CPUs by
+    default), which share those aggregates instead of reloading the data.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown export format {fmt!r}; expected one of {EXPORT_FORMATS}"
+        )
+    started = time.perf_counter()
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    query_backend = open_backend(data_path, backend)
+    all_edge_counts = query_backend.edge_counts()
+    global_min_count, global_max_count = get_global_incoming_range(all_edge_counts)
+    elements = build_overall_graph_elements(
+        query_backend.edge_counts(start, end),
+        global_min_count,
+        global_max_count,
+        positions=service_graph_positions(all_edge_counts),
+        anomalous_edges=anomalous_edges(load_anomalies(data_path), start, end),
+    )
+    index = [{"kind": "overall_graph", "path": _write_overall_graph(elements, out, fmt)}]
+
+    # Both tables are grouped by the backend, so no event rows reach Python.
+    cells = query_backend.heatmap_cells_by_service(start, end)
+    event_counts = query_backend.event_code_counts_by_edge(start, end)
+    tables = {
+        "output_dir": out,
+        "format": fmt,
+        "heatmap": {
+            service: frame.drop(columns="service_name").reset_index(drop=True)
+            for service, frame in cells.groupby("service_name", sort=False)
+        },
+        "edge": {
+            edge: frame.drop(columns=["service_name", "callee"]).reset_index(drop=True)
+            for edge, frame in event_counts.groupby(
+                ["service_name", "callee"], sort=False
+            )
+        },
+    }
+    if fmt == "html":
+        (out / "plotly.min.js").write_text(get_plotlyjs())
+
+    tasks = [("heatmap", service) for service in sorted(tables["heatmap"])]
+    tasks += [("edge_histogram", edge) for edge in sorted(tables["edge"])]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 2:
+        _init_worker(tables)
+        entries = _export_chunk(tasks)
+    else:
+        # Several chunks per worker balance uneven views without paying a
+        # round trip per view.
+        chunk_size = max(1, len(tasks) // (workers * 4))
+        chunks = [tasks[i : i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        context = (
+            multiprocessing.get_context("fork")
+            if "fork" in multiprocessing.get_all_start_methods()
+            else None
+        )
+        with ProcessPoolExecutor(
+            workers, mp_context=context, initializer=_init_worker, initargs=(tables,)
+        ) as executor:
+            entries = [
+                entry for chunk in executor.map(_export_chunk, chunks) for entry in chunk
+            ]
+    index.extend(entries)
+
+    (out / "index.json").write_text(
+        json.dumps(
+            {
+                "start": str(start) if start is not None else None,
+                "end": str(end) if end is not None else None,
+                "views": index,
+            },
+            indent=2,
+        )
+    )
+    return ExportResult(
+        output_dir=out,
+        views=len(index),
+        heatmaps=sum(entry["kind"] == "heatmap" for entry in entries),
+        edge_histograms=sum(entry["kind"] == "edge_histogram" for entry in entries),
+        seconds=time.perf_counter() - started,
+    )
@@ -0,0 +1,156 @@
+"""Server-side layered graph layout with a cache keyed by graph topology."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+X_SPACING = 150
+Y_SPACING = 150
+SWEEPS = 8
+
+
+def topology_key(nodes, edges) -> str:
+    digest = hashlib.sha1()
+    for node in sorted(map(str, nodes)):
+        digest.update(b"n" + node.encode() + b"\0")
+    for source, target in sorted((str(s), str(t)) for s, t in edges):
+        digest.update(b"e" + source.encode() + b"\0" + target.encode() + b"\0")
+    return digest.hexdigest()
+
+
+def _acyclic_edges(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    # Iterative DFS from source nodes first; edges that point back to a node
+    # on the current DFS path close a cycle and are left out of the layering.
+    children = [[] for _ in range(n)]
+    for edge, (s, t) in enumerate(zip(src.tolist(), dst.tolist())):
+        children[s].append((t, edge))
+
+    indegree = np.bincount(dst, minlength=n)
+    starts = np.concatenate([np.flatnonzero(indegree == 0), np.arange(n)])
+    state = np.zeros(n, dtype=np.int8)  # 0 new, 1 on path, 2 done
+    keep = np.ones(len(src), dtype=bool)
+    for root in starts.tolist():
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(children[root]))]
+        while stack:
+            node, pending = stack[-1]
+            for child, edge in pending:
+                if state[child] == 1:
+                    keep[edge] = False
+                elif state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(children[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return keep
+
+
+def _longest_path_layers(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    layer = np.zeros(n, dtype=np.int64)
+    indegree = np.bincount(dst, minlength=n)
+    order = np.argsort(src, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+    frontier = np.flatnonzero(indegree == 0)
+    while len(frontier):
+        reached = np.concatenate(
+            [dst[order[offsets[node] : offsets[node + 1]]] for node in frontier]
+        )
+        if not len(reached):
+            break
+        np.maximum.at(
+            layer,
+            reached,
+            np.repeat(layer[frontier] + 1, offsets[frontier + 1] - offsets[frontier]),
+        )
+        np.subtract.at(indegree, reached, 1)
+        frontier = np.unique(reached[indegree[reached] == 0])
+    return layer
+
+
+def _order_within_layers(
+    n: int, layer: np.ndarray, src: np.ndarray, dst: np.ndarray, sweeps: int
+) -> np.ndarray:
+    # Barycenter heuristic: move each node towards the mean position of its
+    # neighbours in the previous (downward sweep) or next (upward sweep)
+    # layer, then re-rank within each layer. Each sweep is O(edges + nodes).
+    rank = np.zeros(n, dtype=np.float64)
+    initial = np.lexsort((np.arange(n), layer))
+    rank[initial] = _ranks_within_layers(layer[initial])
+    for sweep in range(sweeps):
+        towards, away = (dst, src) if sweep % 2 == 0 else (src, dst)
+        total = np.bincount(towards, weights=rank[away], minlength=n)
+        count = np.bincount(towards, minlength=n)
+        barycenter = np.where(count > 0, total / np.maximum(count, 1), rank)
+        order = np.lexsort((rank, barycenter, layer))
+        rank[order] = _ranks_within_layers(layer[order])
+    return rank
+
+
+def _ranks_within_layers(sorted_layers: np.ndarray) -> np.ndarray:
+    starts = np.flatnonzero(np.r_[True, sorted_layers[1:] != sorted_layers[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_layers)])
+    return np.arange(len(sorted_layers)) - np.repeat(starts, counts)
+
+
+def layered_layout(nodes, edges, sweeps: int = SWEEPS) -> dict:
+    """Sugiyama-style layout: cycle removal, longest-path layers, barycenter order.
+
+    Returns ``{node: {"x": ..., "y": ...}}`` with layers stacked top to bottom
+    and each layer centred horizontally.
+    """
+    nodes = sorted(set(nodes), key=str)
+    if not nodes:
+        return {}
+    index = {node: i for i, node in enumerate(nodes)}
+    pairs = sorted(
+        {(index[s], index[t]) for s, t in edges if s in index and t in index and s != t}
+    )
+    n = len(nodes)
+    src = np.array([s for s, _ in pairs], dtype=np.int64)
+    dst = np.array([t for _, t in pairs], dtype=np.int64)
+
+    keep = _acyclic_edges(n, src, dst)
+    layer = _longest_path_layers(n, src[keep], dst[keep])
+    rank = _order_within_layers(n, layer, src, dst, sweeps)
+
+    width = np.bincount(layer, minlength=layer.max() + 1)[layer]
+    x = (rank - (width - 1) / 2) * X_SPACING
+    y = layer * Y_SPACING
+    return {
+        node: {"x": float(x[i]), "y": float(y[i])} for node, i in index.items()
+    }
+
+
+class LayoutCache:
+    """Bounded, thread-safe cache of layouts keyed by ``topology_key``."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._positions: OrderedDict = OrderedDict()
+
+    def positions(self, nodes, edges) -> dict:
+        nodes = set(nodes)
+        edges = set(edges)
+        key = topology_key(nodes, edges)
+        with self._lock:
+            cached = self._positions.get(key)
+            if cached is not None:
+                self._positions.move_to_end(key)
+                return cached
+
+        positions = layered_layout(nodes, edges)
+        with self._lock:
+            self._positions[key] = positions
+            while len(self._positions) > self.max_entries:
+                self._positions.popitem(last=False)
+        return positions
+
+
+layout_cache = LayoutCache()
@@ -1,62 +1,81 @@
 """Plot and graph builders."""
 
-from collections import defaultdict, deque
-
 import dash_bootstrap_components as dbc
 import matplotlib.cm as cm
 import matplotlib.colors as mcolors
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 
+from ..preprocessing.critical_path import (
+    analyze_call_tree,
+    summarize_latency_attribution,
+)
+from .graph_layout import layout_cache
+
+
+def _call_graph_positions(df: pd.DataFrame) -> dict:
+    calls = df.dropna(subset=["callee"])
+    nodes = set(df["service_name"]).union(set(calls["callee"]))
+    return layout_cache.positions(nodes, zip(calls["service_name"], calls["callee"]))
+
+
+def service_graph_positions(edge_counts: pd.DataFrame) -> dict:
+    nodes = set(edge_counts["service_name"]).union(set(edge_counts["callee"]))
+    return layout_cache.positions(
+        nodes, zip(edge_counts["service_name"], edge_counts["callee"])
+    )
 
-def _compute_node_depth(df: pd.DataFrame):
-    edges = [
-        (row["service_name"], row["callee"])
-        for _, row in df.iterrows()
-        if pd.notna(row["callee"])
-    ]
 
-    children = defaultdict(list)
-    parents = set()
-    for src, tgt in edges:
-        children[src].append(tgt)
-        parents.add(tgt)
+def with_call_tree(df: pd.DataFrame) -> pd.DataFrame:
+    if "critical_path" in df or df.empty:
+        return df
+    # Data preprocessed before the call-tree step existed: analyse the
+    # (already trace-filtered) rows on the fly.
+    return df.join(analyze_call_tree(df, duration_unit="ms"))
 
-    roots = [n for n in set(df["service_name"]) if n not in parents]
-    node_depth = {}
-    queue = deque([(root, 0) for root in roots])
 
-    while queue:
-        node, depth = queue.popleft()
-        if node not in node_depth or depth < node_depth[node]:
-            node_depth[node] = depth
-            for child in children.get(node, []):
-                queue.append((child, depth + 1))
-    return node_depth
+def _critical_nodes(df: pd.DataFrame) -> set:
+    if "critical_path" not in df:
+        return set()
+    critical = df[df["critical_path"].fillna(False).astype(bool)]
+    return set(critical["service_name"]).union(set(critical["callee"].dropna()))
+
+
+def _group_edges(df: pd.DataFrame) -> pd.DataFrame:
+    calls = df.dropna(subset=["callee"])
+    if "critical_path" not in calls:
+        calls = calls.assign(critical_path=False)
+    return (
+        calls.assign(critical_path=calls["critical_path"].fillna(False).astype(bool))
+        .groupby(["service_name", "callee", "event_code"])
+        .agg(
+            call_duration=("call_duration", "mean"),
+            critical_path=("critical_path", "any"),
+        )
+        .reset_index()
+    )
 
 
 def build_trace_elements(df: pd.DataFrame):
-    node_depth = _compute_node_depth(df)
+    df = with_call_tree(df)
+    positions = _call_graph_positions(df)
+    critical_nodes = _critical_nodes(df)
     cy_nodes = []
-    for node in set(df["service_name"]).union(set(df["callee"].dropna())):
+    for node, position in positions.items():
         cy_nodes.append(
             {
                 "data": {"id": node, "label": node},
-                "position": {
-                    "x": 100 * node_depth.get(node, 0),
-                    "y": 200 * node_depth.get(node, 0),
-                },
+                "classes": "critical" if node in critical_nodes else "",
+                "position": position,
             }
         )
 
     cy_edges = []
     if not df.empty:
-        edge_groups = (
-            df.dropna(subset=["callee"])
-            .groupby(["service_name", "callee", "event_code"])["call_duration"]
-            .mean()
-            .reset_index()
-        )
+        edge_groups = _group_edges(df)
         for _, row in edge_groups.iterrows():
             cy_edges.append(
                 {
@@ -64,7 +83,8 @@ def build_trace_elements(df: pd.DataFrame):
                         "source": row["service_name"],
                         "target": row["callee"],
                         "label": f"{row['event_code']} (avg: {row['call_duration']:.1f}ms)",
-                    }
+                    },
+                    "classes": "critical" if row["critical_path"] else "",
                 }
             )
 
@@ -72,24 +92,21 @@ def build_trace_elements(df: pd.DataFrame):
 
 
 def build_span_elements(df: pd.DataFrame):
-    node_depth = _compute_node_depth(df)
-    all_nodes = list(set(df["service_name"]).union(set(df["callee"].dropna())))
+    df = with_call_tree(df)
+    positions = _call_graph_positions(df)
+    critical_nodes = _critical_nodes(df)
 
     cy_nodes = []
-    for idx, node in enumerate(all_nodes):
+    for node, position in positions.items():
         cy_nodes.append(
             {
                 "data": {"id": node, "label": node},
-                "position": {"x": 150 * node_depth.get(node, 0), "y": 120 * idx},
+                "classes": "critical" if node in critical_nodes else "",
+                "position": position,
             }
         )
 
-    edge_groups = (
-        df.dropna(subset=["callee"])
-        .groupby(["service_name", "callee", "event_code"])["call_duration"]
-        .mean()
-        .reset_index()
-    )
+    edge_groups = _group_edges(df)
     cy_edges = []
     for _, row in edge_groups.iterrows():
         cy_edges.append(
@@ -98,39 +115,102 @@ def build_span_elements(df: pd.DataFrame):
                     "source": row["service_name"],
                     "target": row["callee"],
                     "label": f"{row['event_code']} (avg: {row['call_duration']:.1f}ms)",
-                }
+                },
+                "classes": "critical" if row["critical_path"] else "",
             }
         )
     return cy_nodes + cy_edges
 
 
-def build_service_heatmap_figure(df: pd.DataFrame, service_name: str):
-    if not service_name:
-        return {}
+def _compact_figure(fig):
+    # Plotly sends numpy arrays base64-encoded with their dtype and already
+    # narrows integers; single precision halves the float data and is ample
+    # for millisecond durations.
+    for trace in fig.data:
+        for name in ("x", "y", "z"):
+            values = trace[name] if name in trace else None
+            if isinstance(values, np.ndarray) and values.dtype == np.float64:
+                # Plotly ignores assignments that compare equal to the current
+                # value, which includes the same numbers in single precision.
+                trace[name] = None
+                trace[name] = values.astype(np.float32)
+    return fig
+
 
-    filtered = df[df["service_name"] == service_name].copy()
-    if filtered.empty:
+def build_service_heatmap_figure(cells: pd.DataFrame, service_name: str):
+    if not service_name or cells.empty:
         return {}
 
-    fig = px.density_heatmap(
-        filtered,
-        x="event_code",
-        y="callee",
-        z="call_duration",
-        color_continuous_scale="YlOrRd",
-        histfunc="avg",
-        labels={
-            "call_duration": "call duration (ms)",
-            "callee": "Callee",
-            "event_code": "Event Code",
-        },
+    # Built from graph objects rather than plotly express, which spends most
+    # of its time validating layout defaults; headless exports build one of
+    # these per service.
+    fig = go.Figure(
+        go.Histogram2d(
+            x=cells["event_code"].to_numpy(),
+            y=cells["callee"].to_numpy(),
+            z=cells["call_duration"].to_numpy(dtype=np.float32),
+            histfunc="avg",
+            coloraxis="coloraxis",
+            hovertemplate=(
+                "Event Code=%{x}<br>Callee=%{y}<br>"
+                "avg of call duration (ms)=%{z}<extra></extra>"
+            ),
+        )
     )
     fig.update_layout(
         title=f"Call Duration Heatmap for {service_name}",
         xaxis_title="Event Code",
         yaxis_title="Callee Service",
+        coloraxis={
+            "colorscale": "YlOrRd",
+            "colorbar": {"title": {"text": "avg of call duration (ms)"}},
+        },
+        margin={"t": 60},
     )
-    return fig
+    return _compact_figure(fig)
+
+
+def build_timeseries_figure(
+    series: pd.DataFrame, resolution: str, seconds: int, title: str
+):
+    if series.empty:
+        return {}
+
+    fig = make_subplots(
+        rows=2,
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.08,
+        subplot_titles=("Calls per second", "Call duration (ms)"),
+    )
+    buckets = series.index
+    fig.add_trace(
+        go.Scatter(
+            x=buckets,
+            y=series["calls"].to_numpy(dtype=float) / seconds,
+            name="calls/s",
+            mode="lines",
+            line={"shape": "hv"},
+        ),
+        row=1,
+        col=1,
+    )
+    for column in ("p50", "p95"):
+        fig.add_trace(
+            go.Scatter(
+                x=buckets,
+                y=series[column].to_numpy(dtype=float),
+                name=column,
+                mode="lines",
+            ),
+            row=2,
+            col=1,
+        )
+    fig.update_layout(
+        title=f"{title} ({resolution} buckets)",
+        margin={"l": 40, "r": 40, "t": 80, "b": 40},
+    )
+    return _compact_figure(fig)
 
 
 def build_event_table(df: pd.DataFrame):
@@ -138,37 +218,45 @@ def build_event_table(df: pd.DataFrame):
     return dbc.Table.from_dataframe(table_df, striped=True, bordered=True, hover=True)
 
 
-def get_global_incoming_range(data: pd.DataFrame):
-    grouped = (
-        data.dropna(subset=["service_name", "callee"])
-        .groupby(["service_name", "callee"])
-        .size()
-        .reset_index(name="count")
+def build_latency_attribution_table(df: pd.DataFrame):
+    df = with_call_tree(df)
+    if "self_duration" not in df:
+        return "No call tree available."
+
+    attribution = summarize_latency_attribution(df)
+    table_df = pd.DataFrame(
+        {
+            "service": attribution["service"],
+            "calls": attribution["calls"],
+            "critical calls": attribution["critical_calls"].astype(int),
+            "self time (ms)": attribution["self_time"].round(1),
+            "child time (ms)": attribution["child_time"].round(1),
+            "total time (ms)": attribution["total_time"].round(1),
+        }
     )
-    incoming_counts = grouped.groupby("callee")["count"].sum().to_dict()
+    return dbc.Table.from_dataframe(table_df, striped=True, bordered=True, hover=True)
+
+
+def get_global_incoming_range(edge_counts: pd.DataFrame):
+    incoming_counts = edge_counts.groupby("callee")["count"].sum().to_dict()
     if not incoming_counts:
         return 0, 1
     return min(incoming_counts.values()), max(incoming_counts.values())
 
 
 def build_overall_graph_elements(
-    filtered_data: pd.DataFrame,
+    df_grouped: pd.DataFrame,
     global_min_count: int,
     global_max_count: int,
-    selected_trace_id=None,
+    df_selected: pd.DataFrame | None = None,
+    positions: dict | None = None,
+    anomalous_edges: set | None = None,
 ):
-    df_grouped = (
-        filtered_data.dropna(subset=["service_name", "callee"])
-        .groupby(["service_name", "callee"])
-        .size()
-        .reset_index(name="count")
-    )
     incoming_counts = df_grouped.groupby("callee")["count"].sum().to_dict()
 
     selected_edges = set()
     selected_nodes = set()
-    if selected_trace_id:
-        df_selected = filtered_data[filtered_data["trace_id"] == selected_trace_id]
+    if df_selected is not None:
         selected_edges = set(zip(df_selected["service_name"], df_selected["callee"]))
         selected_nodes = set(df_selected["service_name"]).union(
             set(df_selected["callee"].dropna())
@@ -184,17 +272,24 @@ def build_overall_graph_elements(
         count = incoming_counts.get(node, 0)
         hex_color = mcolors.rgb2hex(cmap(norm(count)))
         classes = "selected" if node in selected_nodes else ""
-        cy_nodes.append(
-            {
-                "data": node_data,
-                "classes": classes,
-                "style": {"background-color": hex_color},
-            }
-        )
+        cy_node = {
+            "data": node_data,
+            "classes": classes,
+            "style": {"background-color": hex_color},
+        }
+        if positions and node in positions:
+            cy_node["position"] = positions[node]
+        cy_nodes.append(cy_node)
 
     cy_edges = []
+    anomalous_edges = anomalous_edges or set()
     for _, row in df_grouped.iterrows():
-        classes = "selected" if (row["service_name"], row["callee"]) in selected_edges else ""
+        edge = (row["service_name"], row["callee"])
+        classes = []
+        if edge in selected_edges:
+            classes.append("selected")
+        if edge in anomalous_edges:
+            classes.append("anomaly")
         cy_edges.append(
             {
                 "data": {
@@ -202,21 +297,14 @@ def build_overall_graph_elements(
                     "target": row["callee"],
                     "label": f"Calls: {row['count']}",
                 },
-                "classes": classes,
+                "classes": " ".join(classes),
             }
         )
 
     return cy_nodes + cy_edges
 
 
-def build_all_event_code_histogram(data: pd.DataFrame):
-    event_counts = (
-        data.groupby("event_code")
-        .size()
-        .reset_index(name="count")
-        .sort_values("count", ascending=False)
-    )
-
+def build_all_event_code_histogram(event_counts: pd.DataFrame):
     fig = px.bar(event_counts, x="event_code", y="count", title="Call Counts")
     fig.update_layout(height=800)
     return fig
@@ -231,35 +319,54 @@ def build_selected_edge_violinplot(
     if df_edge.empty:
         return {}
 
-    fig = px.violin(
-        df_edge,
-        x="event_code",
-        y="call_duration",
-        points="all",
-        box=True,
+    # One trace per event code positions each violin by its trace name, so
+    # the event code is not repeated for every plotted point.
+    fig = go.Figure(
+        [
+            go.Violin(
+                y=durations.to_numpy(dtype=np.float32),
+                name=str(event_code),
+                points="all",
+                box_visible=True,
+                line_color=px.colors.qualitative.Plotly[0],
+                showlegend=False,
+                hovertemplate=(
+                    f"event_code={event_code}<br>call_duration=%{{y}}<extra></extra>"
+                ),
+            )
+            for event_code, durations in df_edge.groupby("event_code", sort=False)[
+                "call_duration"
+            ]
+        ]
+    )
+    fig.update_layout(
         title=f"Call Duration Violin Plot: {source} -> {target}",
+        xaxis_title="event_code",
+        yaxis_title="call_duration",
+        violinmode="overlay",
+        height=500,
     )
-    fig.update_layout(height=500)
     return fig
 
 
-def build_edge_event_code_histogram(data: pd.DataFrame, source: str, target: str):
-    df_edge = data[(data["service_name"] == source) & (data["callee"] == target)]
-    if df_edge.empty:
+def build_edge_event_code_histogram(
+    event_counts: pd.DataFrame, source: str, target: str
+):
+    if event_counts.empty:
         return {}
 
-    event_counts = (
-        df_edge.groupby("event_code")
-        .size()
-        .reset_index(name="count")
-        .sort_values("count", ascending=False)
+    fig = go.Figure(
+        go.Bar(
+            x=event_counts["event_code"].to_numpy(),
+            y=event_counts["count"].to_numpy(),
+            marker_color=px.colors.qualitative.Plotly[0],
+            hovertemplate="event_code=%{x}<br>count=%{y}<extra></extra>",
+        )
     )
-
-    fig = px.bar(
-        event_counts,
-        x="event_code",
-        y="count",
+    fig.update_layout(
         title=f"Call Counts for {source} -> {target}",
+        xaxis_title="event_code",
+        yaxis_title="count",
+        height=800,
     )
-    fig.update_layout(height=800)
     return fig
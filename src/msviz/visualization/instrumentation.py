@@ -0,0 +1,46 @@
+"""Logs the size and server time of every callback response."""
+
+import logging
+import time
+
+from flask import g, request, request_finished
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_PATH = "_dash-update-component"
+
+
+def log_callback_payloads(server) -> None:
+    """Log bytes sent, before and after compression, and time per callback.
+
+    Must be called after the Dash app owning ``server`` has been created:
+    ``after_request`` hooks run in reverse registration order, so the hook
+    below sees the response before flask-compress encodes it, while
+    ``request_finished`` fires once the encoded response is final.
+    """
+
+    @server.before_request
+    def _start_timer():
+        g.callback_started = time.perf_counter()
+
+    @server.after_request
+    def _record_raw_size(response):
+        g.callback_raw_bytes = response.content_length
+        return response
+
+    def _log_payload(sender, response, **extra):
+        if not request.path.endswith(CALLBACK_PATH) or not logger.isEnabledFor(
+            logging.INFO
+        ):
+            return
+        body = request.get_json(silent=True) or {}
+        logger.info(
+            "callback %s: %s bytes sent (%s uncompressed, %s) in %.1f ms",
+            body.get("output", "?"),
+            response.content_length,
+            g.get("callback_raw_bytes"),
+            response.headers.get("Content-Encoding", "identity"),
+            (time.perf_counter() - g.callback_started) * 1000,
+        )
+
+    request_finished.connect(_log_payload, server, weak=False)
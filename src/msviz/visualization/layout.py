@@ -2,17 +2,57 @@
 
 import dash_bootstrap_components as dbc
 import dash_cytoscape as cyto
-import plotly.express as px
 from dash import dcc, html
 
+from .graphs import build_all_event_code_histogram
+from .trace_index import build_trace_options, describe_trace_page, trace_page_count
+
+
+def describe_dataset(context) -> list:
+    return [
+        html.Div(f"Total records: {context.num_records}"),
+        html.Div(f"Start time: {context.first_timestamp}"),
+        html.Div(f"End time: {context.last_timestamp}"),
+    ]
+
+
+def slider_marks(context) -> dict:
+    return {
+        context.min_timestamp: context.first_timestamp,
+        context.max_timestamp: context.last_timestamp,
+    }
+
+
+def split_window(context) -> tuple[list, list]:
+    middle = (context.min_timestamp + context.max_timestamp) // 2
+    return [context.min_timestamp, middle], [middle, context.max_timestamp]
+
+
+def build_sample_banner(sample, loading: bool = False):
+    if sample is None:
+        return None
+    text = sample.describe()
+    if loading:
+        text += " The full dataset is loading and will replace the sample when ready."
+    return dbc.Alert(text, color="warning", className="mb-2")
+
+
+def build_layout(
+    dataset, overall_stylesheet, anomalies=None, loading=False, version=0
+):
+    context = dataset.context
+    # The trace views start from the slowest trace, and comparisons from the
+    # two slowest traces and the two halves of the time range.
+    trace_options, total_traces = build_trace_options(dataset.trace_index)
+    compare_traces = [option["value"] for option in trace_options[:2]]
+    compare_traces += [None] * (2 - len(compare_traces))
+    selected_trace_id = compare_traces[0]
+    compare_windows = split_window(context)
 
-def build_layout(context, data, overall_stylesheet):
     sidebar = dbc.Col(
         [
             html.H5("Controls", className="mb-3"),
-            html.Div(f"Total records: {context.num_records}"),
-            html.Div(f"Start time: {context.first_timestamp}"),
-            html.Div(f"End time: {context.last_timestamp}"),
+            html.Div(describe_dataset(context), id="dataset-summary"),
             html.Label("Select Time Range:", style={"marginTop": "40px"}),
             html.Div(
                 id="slider-tooltip",
@@ -23,24 +63,35 @@ def build_layout(context, data, overall_stylesheet):
                 min=context.min_timestamp,
                 max=context.max_timestamp,
                 value=[context.min_timestamp, context.max_timestamp],
-                marks={
-                    context.min_timestamp: context.first_timestamp,
-                    context.max_timestamp: context.last_timestamp,
-                },
+                marks=slider_marks(context),
                 step=1,
             ),
             html.Label("Select Trace ID:", style={"marginTop": "40px"}),
+            dcc.Dropdown(
+                id="trace-service-filter",
+                options=[{"label": name, "value": name} for name in context.service_names],
+                value=None,
+                placeholder="Filter traces by service",
+                style={"marginBottom": "10px"},
+            ),
             dcc.Dropdown(
                 id="trace-id-dropdown",
-                options=[
-                    {
-                        "label": (f"{str(tid)[:8]}..." if len(str(tid)) > 8 else str(tid)),
-                        "value": tid,
-                    }
-                    for tid in context.trace_ids
-                ],
-                value=context.trace_ids[0] if context.trace_ids else None,
-                placeholder="Select a trace_id",
+                options=trace_options,
+                value=selected_trace_id,
+                placeholder="Search by trace_id prefix",
+            ),
+            html.Div(
+                id="trace-search-summary",
+                children=describe_trace_page(1, total_traces),
+                style={"fontSize": "small", "marginTop": "5px"},
+            ),
+            dbc.Pagination(
+                id="trace-pagination",
+                active_page=1,
+                max_value=trace_page_count(total_traces),
+                fully_expanded=False,
+                size="sm",
+                style={"marginTop": "5px"},
             ),
             html.Label("Select Span ID:", style={"marginTop": "40px"}),
             dcc.Dropdown(
@@ -69,6 +120,14 @@ def build_layout(context, data, overall_stylesheet):
 
     main_content = dbc.Col(
         [
+            html.Div(
+                build_sample_banner(dataset.sample, loading),
+                id="sample-banner",
+                style={"marginTop": "10px"},
+            ),
+            # Polls for the full dataset replacing a quick-look sample.
+            dcc.Interval(id="dataset-poll", interval=2000, disabled=not loading),
+            dcc.Store(id="dataset-version", data=version),
             dcc.Tabs(
                 [
                     dcc.Tab(
@@ -78,14 +137,18 @@ def build_layout(context, data, overall_stylesheet):
                                 "Overall Service to Callee Service Graph (All Data)",
                                 style={"marginTop": "40px"},
                             ),
+                            html.Div(
+                                f"{len(anomalies)} latency anomalies were detected "
+                                "during preprocessing. Edges with an anomaly in the "
+                                "selected time range are drawn as dashed red lines.",
+                                style={"marginBottom": "10px"},
+                            )
+                            if anomalies is not None
+                            else None,
                             html.Div(
                                 cyto.Cytoscape(
                                     id="overall-cytoscape-graph",
-                                    layout={
-                                        "name": "breadthfirst",
-                                        "directed": True,
-                                        "padding": 10,
-                                    },
+                                    layout={"name": "preset", "padding": 10},
                                     style={"width": "100%", "height": "800px"},
                                     elements=[],
                                     stylesheet=overall_stylesheet,
@@ -97,6 +160,7 @@ def build_layout(context, data, overall_stylesheet):
                                     "background": "#fff",
                                 },
                             ),
+                            dcc.Store(id="overall-graph-sync"),
                             dbc.Modal(
                                 [
                                     dbc.ModalHeader(dbc.ModalTitle("Call Counts Histogram")),
@@ -118,11 +182,7 @@ def build_layout(context, data, overall_stylesheet):
                             html.Div(
                                 cyto.Cytoscape(
                                     id="cytoscape-graph",
-                                    layout={
-                                        "name": "breadthfirst",
-                                        "directed": True,
-                                        "padding": 10,
-                                    },
+                                    layout={"name": "preset", "padding": 10},
                                     style={"width": "100%", "height": "800px"},
                                     elements=[],
                                     stylesheet=overall_stylesheet,
@@ -134,6 +194,18 @@ def build_layout(context, data, overall_stylesheet):
                                     "background": "#fff",
                                 },
                             ),
+                            html.H5(
+                                "Latency Attribution (Selected trace_id)",
+                                style={"marginTop": "20px"},
+                            ),
+                            html.Div(
+                                "Orange nodes and edges form the critical path: the chain "
+                                "of calls that determined the trace's end-to-end latency. "
+                                "Self time is spent in the called service itself, child "
+                                "time in the calls it makes.",
+                                style={"marginBottom": "10px"},
+                            ),
+                            html.Div(id="latency-attribution-table"),
                             dbc.Modal(
                                 [
                                     dbc.ModalHeader(
@@ -157,11 +229,7 @@ def build_layout(context, data, overall_stylesheet):
                             html.Div(
                                 cyto.Cytoscape(
                                     id="span-cytoscape-graph",
-                                    layout={
-                                        "name": "breadthfirst",
-                                        "directed": True,
-                                        "padding": 10,
-                                    },
+                                    layout={"name": "preset", "padding": 10},
                                     style={"width": "100%", "height": "800px"},
                                     elements=[],
                                     stylesheet=overall_stylesheet,
@@ -182,7 +250,9 @@ def build_layout(context, data, overall_stylesheet):
                             html.H4("Call Counts Histogram (All Data)", style={"marginTop": "40px"}),
                             dcc.Graph(
                                 id="event-code-histogram",
-                                figure=px.histogram(data, x="event_code", title="Call Counts"),
+                                figure=build_all_event_code_histogram(
+                                    dataset.backend.event_code_counts()
+                                ),
                                 style={"height": "600px"},
                             ),
                         ],
@@ -197,6 +267,136 @@ def build_layout(context, data, overall_stylesheet):
                             dcc.Graph(id="heatmap-graph", style={"height": "800px"}),
                         ],
                     ),
+                    dcc.Tab(
+                        label="Time Series",
+                        children=[
+                            html.H4(
+                                "Call Rate and Latency over Time",
+                                style={"marginTop": "40px"},
+                            ),
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id="timeseries-service-dropdown",
+                                            options=[
+                                                {"label": name, "value": name}
+                                                for name in context.service_names
+                                            ],
+                                            value=context.service_names[0]
+                                            if context.service_names
+                                            else None,
+                                            placeholder="Select a service_name",
+                                        ),
+                                        width=4,
+                                    ),
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id="timeseries-callee-dropdown",
+                                            options=[],
+                                            value=None,
+                                            placeholder="All callees",
+                                        ),
+                                        width=4,
+                                    ),
+                                ],
+                                style={"marginBottom": "10px"},
+                            ),
+                            html.Div(
+                                "The bucket size follows the selected time range: "
+                                "1 second, 1 minute or 1 hour, whichever is finest "
+                                "while keeping the chart to a few thousand points.",
+                                style={"fontSize": "small"},
+                            ),
+                            dcc.Graph(id="timeseries-graph", style={"height": "700px"}),
+                        ],
+                    ),
+                    dcc.Tab(
+                        label="Compare",
+                        children=[
+                            html.H4(
+                                "Per-Edge Differences between Two Traces or Time Windows",
+                                style={"marginTop": "40px"},
+                            ),
+                            dbc.RadioItems(
+                                id="compare-mode",
+                                options=[
+                                    {"label": "Two traces", "value": "traces"},
+                                    {"label": "Two time windows", "value": "windows"},
+                                ],
+                                value="traces",
+                                inline=True,
+                                style={"marginBottom": "10px"},
+                            ),
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        dcc.Dropdown(
+                                            id=f"compare-trace-{side}",
+                                            options=trace_options,
+                                            value=trace_id,
+                                            placeholder=placeholder,
+                                        ),
+                                        width=6,
+                                    )
+                                    for side, trace_id, placeholder in zip(
+                                        "ab",
+                                        compare_traces,
+                                        ["Baseline trace_id", "Comparison trace_id"],
+                                    )
+                                ],
+                                id="compare-trace-controls",
+                                style={"marginBottom": "10px"},
+                            ),
+                            html.Div(
+                                [
+                                    html.Div(
+                                        [
+                                            html.Label(label),
+                                            dcc.RangeSlider(
+                                                id=f"compare-window-{side}",
+                                                min=context.min_timestamp,
+                                                max=context.max_timestamp,
+                                                value=window,
+                                                marks=slider_marks(context),
+                                                step=1,
+                                            ),
+                                        ]
+                                    )
+                                    for side, window, label in zip(
+                                        "ab",
+                                        compare_windows,
+                                        ["Baseline window", "Comparison window"],
+                                    )
+                                ],
+                                id="compare-window-controls",
+                                style={"display": "none"},
+                            ),
+                            html.Div(
+                                id="compare-summary",
+                                style={"marginBottom": "10px"},
+                            ),
+                            html.Div(
+                                cyto.Cytoscape(
+                                    id="compare-cytoscape-graph",
+                                    layout={"name": "preset", "padding": 10},
+                                    style={"width": "100%", "height": "700px"},
+                                    elements=[],
+                                    stylesheet=overall_stylesheet,
+                                ),
+                                style={
+                                    "border": "2px solid #0074D9",
+                                    "borderRadius": "8px",
+                                    "padding": "10px",
+                                    "background": "#fff",
+                                },
+                            ),
+                            html.H5(
+                                "Largest Latency Changes", style={"marginTop": "20px"}
+                            ),
+                            html.Div(id="compare-table"),
+                        ],
+                    ),
                     dcc.Tab(
                         label="Event Table",
                         children=[
@@ -0,0 +1,182 @@
+"""Query plan shared by all callbacks fired by one dashboard interaction."""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+
+from .backends import QueryBackend, summarize_edge_latency
+from .data import DataContext
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlan(QueryBackend):
+    """Caches backend results keyed by the inputs of an interaction.
+
+    Moving the time range slider fires several callbacks that all need the
+    same time window, and the trace views all need the same trace slice. The
+    plan computes each slice or aggregate once, lets concurrent callbacks wait
+    for that single computation, and derives narrower filters (for example a
+    single edge of the selected trace) from the cached slice. When INFO
+    logging is enabled, each cache miss logs the rows it had the backend scan.
+    """
+
+    def __init__(self, backend: QueryBackend, max_entries: int = 64):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._results: OrderedDict = OrderedDict()
+
+    def _cached(self, key: tuple, compute, start=None, end=None, service_name=None):
+        with self._lock:
+            future = self._results.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._results[key] = future
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+
+        if owner:
+            try:
+                result = compute()
+            except BaseException as exc:
+                with self._lock:
+                    self._results.pop(key, None)
+                future.set_exception(exc)
+                raise
+            future.set_result(result)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "query %s scanned %d rows and returned %d; window %s to %s",
+                    key[0],
+                    self.backend.scan_size(start, end, service_name),
+                    len(result),
+                    start,
+                    end,
+                )
+        return future.result()
+
+    def build_context(self) -> DataContext:
+        return self.backend.build_context()
+
+    def count_rows(self, start=None, end=None) -> int:
+        return self.backend.count_rows(start, end)
+
+    def scan_size(self, start=None, end=None, service_name=None) -> int:
+        return self.backend.scan_size(start, end, service_name)
+
+    def rows(
+        self,
+        start=None,
+        end=None,
+        trace_id=None,
+        transaction_id=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        if trace_id is None and transaction_id is None:
+            return self._cached(
+                ("window_rows", start, end, service_name, callee),
+                lambda: self.backend.rows(
+                    start=start, end=end, service_name=service_name, callee=callee
+                ),
+                start,
+                end,
+                service_name,
+            )
+
+        df = self._cached(
+            ("trace_rows", start, end, trace_id, transaction_id),
+            lambda: self.backend.rows(
+                start=start, end=end, trace_id=trace_id, transaction_id=transaction_id
+            ),
+            start,
+            end,
+        )
+        if service_name is not None:
+            df = df[df["service_name"] == service_name]
+        if callee is not None:
+            df = df[df["callee"] == callee]
+        return df
+
+    def edge_counts(self, start=None, end=None) -> pd.DataFrame:
+        return self._cached(
+            ("edge_counts", start, end),
+            lambda: self.backend.edge_counts(start, end),
+            start,
+            end,
+        )
+
+    def edge_latency(self, start=None, end=None, trace_id=None) -> pd.DataFrame:
+        if trace_id is not None:
+            # Usually the trace is already sliced for the trace views.
+            return summarize_edge_latency(self.rows(start, end, trace_id=trace_id))
+        return self._cached(
+            ("edge_latency", start, end),
+            lambda: self.backend.edge_latency(start, end),
+            start,
+            end,
+        )
+
+    def event_code_counts(self, service_name=None, callee=None) -> pd.DataFrame:
+        return self._cached(
+            ("event_code_counts", service_name, callee),
+            lambda: self.backend.event_code_counts(service_name, callee),
+            service_name=service_name,
+        )
+
+    def heatmap_cells(self, service_name, start=None, end=None) -> pd.DataFrame:
+        return self._cached(
+            ("heatmap_cells", service_name, start, end),
+            lambda: self.backend.heatmap_cells(service_name, start, end),
+            start,
+            end,
+            service_name,
+        )
+
+    def heatmap_cells_by_service(self, start=None, end=None) -> pd.DataFrame:
+        return self.backend.heatmap_cells_by_service(start, end)
+
+    def event_code_counts_by_edge(self, start=None, end=None) -> pd.DataFrame:
+        return self.backend.event_code_counts_by_edge(start, end)
+
+    def span_ids(self, trace_id) -> list:
+        return self._cached(
+            ("span_ids", trace_id),
+            lambda: self.backend.span_ids(trace_id),
+        )
+
+    def trace_summaries(self) -> pd.DataFrame:
+        return self._cached(
+            ("trace_summaries",),
+            self.backend.trace_summaries,
+        )
+
+    def latency_rollup(
+        self,
+        resolution_seconds: int,
+        by_callee: bool = False,
+        start=None,
+        end=None,
+        service_name=None,
+        callee=None,
+    ) -> pd.DataFrame:
+        args = (resolution_seconds, by_callee, start, end, service_name, callee)
+        if start is None and end is None:
+            # Whole-dataset rollups are built once and held by the time-series
+            # view, so they bypass the LRU rather than evict the
+            # per-interaction entries.
+            return self.backend.latency_rollup(*args)
+        return self._cached(
+            ("latency_rollup", *args),
+            lambda: self.backend.latency_rollup(*args),
+            start,
+            end,
+            service_name,
+        )
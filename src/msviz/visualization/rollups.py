@@ -0,0 +1,101 @@
+"""Multi-resolution call-rate and latency rollups for the time-series view."""
+
+import threading
+
+import pandas as pd
+
+# Bucket sizes in seconds, finest first.
+RESOLUTIONS = {"1s": 1, "1min": 60, "1h": 3600}
+# Most buckets a single chart is drawn from.
+MAX_POINTS = 3000
+# Resolutions aggregated per query for the window shown rather than held for
+# the whole dataset: at 1 s that table would have a row per second of data
+# for every service and edge.
+WINDOWED_RESOLUTIONS = {"1s"}
+
+
+def choose_resolution(start, end) -> str:
+    """The finest resolution that covers ``start``..``end`` in MAX_POINTS buckets."""
+    span = (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds()
+    for name, seconds in RESOLUTIONS.items():
+        if span / seconds <= MAX_POINTS:
+            return name
+    return list(RESOLUTIONS)[-1]
+
+
+class LatencyRollups:
+    """Calls, p50 and p95 per service and per edge at every resolution.
+
+    Each (resolution, level) table is aggregated from the backend once, on
+    first use, and split into one time-sorted frame per service or edge. A
+    time-window query then only slices the buckets of one key, so its cost
+    is bounded by MAX_POINTS however many rows the window spans. The
+    WINDOWED_RESOLUTIONS are instead aggregated by the backend for the one
+    key and window asked for, which at those resolutions spans at most
+    MAX_POINTS buckets of rows.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._tables: dict = {}
+        self._lock = threading.Lock()
+
+    def _table(self, resolution: str, by_callee: bool) -> dict:
+        key = (resolution, by_callee)
+        with self._lock:
+            if key not in self._tables:
+                rollup = self.backend.latency_rollup(RESOLUTIONS[resolution], by_callee)
+                keys = ["service_name", "callee"] if by_callee else ["service_name"]
+                rollup["bucket"] = pd.to_datetime(rollup["bucket"])
+                self._tables[key] = {
+                    group if by_callee else group[0]: frame.set_index("bucket")[
+                        ["calls", "p50", "p95"]
+                    ].sort_index()
+                    for group, frame in rollup.groupby(keys, sort=False)
+                }
+            return self._tables[key]
+
+    def _window(self, resolution: str, service_name, callee, first, last):
+        # The whole of the last bucket is aggregated, as in the full tables.
+        end = last + pd.Timedelta(resolution) - pd.Timedelta(1, "us")
+        rollup = self.backend.latency_rollup(
+            RESOLUTIONS[resolution],
+            callee is not None,
+            first,
+            end,
+            service_name,
+            callee,
+        )
+        if rollup.empty:
+            return None
+        rollup["bucket"] = pd.to_datetime(rollup["bucket"])
+        return rollup.set_index("bucket")[["calls", "p50", "p95"]].sort_index()
+
+    def series(
+        self, service_name: str, start, end, callee: str | None = None
+    ) -> tuple[str, pd.DataFrame]:
+        """Buckets of one service (or edge) between ``start`` and ``end``.
+
+        Buckets without calls are filled in with zero calls and missing
+        percentiles, so rates drop to zero and latency lines show a gap.
+        """
+        resolution = choose_resolution(start, end)
+        first = pd.Timestamp(start).floor(resolution)
+        last = pd.Timestamp(end).floor(resolution)
+        if resolution in WINDOWED_RESOLUTIONS:
+            frame = self._window(resolution, service_name, callee, first, last)
+        else:
+            table = self._table(resolution, callee is not None)
+            frame = table.get(
+                (service_name, callee) if callee is not None else service_name
+            )
+        buckets = pd.date_range(first, last, freq=resolution, name="bucket")
+        if frame is None:
+            frame = pd.DataFrame(
+                columns=["calls", "p50", "p95"],
+                index=pd.DatetimeIndex([], name="bucket"),
+                dtype=float,
+            )
+        series = frame.loc[first:last].reindex(buckets)
+        series["calls"] = series["calls"].fillna(0)
+        return resolution, series
@@ -0,0 +1,134 @@
+"""Memory-bounded row samples of processed data for quick-look mode."""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .data import DASHBOARD_COLUMNS, iter_data_batches, normalize_processed
+
+SAMPLE_MODES = ("trace", "time")
+
+
+@dataclass(frozen=True)
+class SampleInfo:
+    mode: str
+    rows_read: int
+    rows_kept: int
+    bucket: str | None = None
+
+    @property
+    def rate(self) -> float:
+        return self.rows_kept / self.rows_read if self.rows_read else 1.0
+
+    def describe(self) -> str:
+        how = (
+            "whole traces sampled by trace_id"
+            if self.mode == "trace"
+            else f"rows sampled evenly across {self.bucket} intervals"
+        )
+        return (
+            f"Quick look: showing {self.rows_kept:,} of {self.rows_read:,} rows "
+            f"({self.rate:.1%}), {how}. Counts cover the sample only."
+        )
+
+
+def sample_by_trace(batches, max_rows: int) -> tuple[pd.DataFrame, int]:
+    """Keep whole traces, chosen by the hash of their trace_id, up to ``max_rows``.
+
+    The traces with the smallest hashes are kept: whenever the sample
+    outgrows ``max_rows`` the hash threshold is lowered and the traces above
+    it are dropped. The threshold only ever decreases, so every row of a
+    kept trace was kept when it arrived, wherever it appears in the input.
+    """
+    threshold = np.iinfo(np.uint64).max
+    sample = None
+    rows_read = 0
+    for batch in batches:
+        rows_read += len(batch)
+        hashes = pd.util.hash_pandas_object(batch["trace_id"], index=False).to_numpy()
+        keep = hashes <= threshold
+        batch = batch[keep].assign(_trace_hash=hashes[keep])
+        sample = batch if sample is None else pd.concat([sample, batch], ignore_index=True)
+        if len(sample) > max_rows:
+            trace_rows = sample.groupby("_trace_hash").size()
+            fits = trace_rows.index[trace_rows.cumsum().to_numpy() <= max_rows]
+            # Always keep at least one trace, even one larger than the budget.
+            threshold = fits[-1] if len(fits) else trace_rows.index[0]
+            sample = sample[sample["_trace_hash"] <= threshold]
+    if sample is None:
+        return pd.DataFrame(columns=list(DASHBOARD_COLUMNS)), rows_read
+    return sample.drop(columns="_trace_hash").reset_index(drop=True), rows_read
+
+
+def _stratum_capacity(sizes: np.ndarray, max_rows: int) -> int:
+    # Largest per-interval cap that fits the budget: quiet intervals keep all
+    # their rows and busy ones share what is left equally.
+    lo, hi = 0, int(sizes.max())
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if np.minimum(sizes, mid).sum() <= max_rows:
+            lo = mid
+        else:
+            hi = mid - 1
+    return max(lo, 1)
+
+
+def sample_by_time(
+    batches, max_rows: int, bucket: str = "1min", seed: int = 0
+) -> tuple[pd.DataFrame, int]:
+    """Time-stratified reservoir sample of at most about ``max_rows`` rows.
+
+    Rows are grouped into ``bucket`` intervals and each interval keeps the
+    rows with the smallest random keys, which is a uniform sample of that
+    interval. The per-interval cap shrinks as more intervals and rows
+    arrive, so bursts are downsampled while quiet periods stay complete.
+    """
+    rng = np.random.default_rng(seed)
+    capacity = None
+    sample = None
+    rows_read = 0
+    for batch in batches:
+        rows_read += len(batch)
+        batch = batch.assign(
+            _stratum=batch["timestamp"].dt.floor(bucket), _key=rng.random(len(batch))
+        )
+        sample = batch if sample is None else pd.concat([sample, batch], ignore_index=True)
+        if len(sample) > max_rows:
+            sizes = sample.groupby("_stratum").size().to_numpy()
+            fitted = _stratum_capacity(sizes, max_rows)
+            capacity = fitted if capacity is None else min(capacity, fitted)
+        if capacity is not None:
+            # Applied to every later batch too, so that an interval which
+            # keeps growing stays a uniform sample of all its rows.
+            rank = sample.groupby("_stratum")["_key"].rank(method="first")
+            sample = sample[rank <= capacity]
+    if sample is None:
+        return pd.DataFrame(columns=list(DASHBOARD_COLUMNS)), rows_read
+    sample = sample.sort_values("timestamp", kind="stable")
+    return sample.drop(columns=["_stratum", "_key"]).reset_index(drop=True), rows_read
+
+
+def load_sample(
+    data_path: str,
+    mode: str = "trace",
+    max_rows: int = 200_000,
+    bucket: str = "1min",
+    columns=DASHBOARD_COLUMNS,
+) -> tuple[pd.DataFrame, SampleInfo]:
+    """Stream the processed data and keep a sample of at most ``max_rows`` rows.
+
+    Only ``columns`` are read, and at most one batch beyond the sample is
+    held in memory at a time.
+    """
+    if mode not in SAMPLE_MODES:
+        raise ValueError(f"Unknown sample mode {mode!r}; expected one of {SAMPLE_MODES}")
+    if mode == "trace":
+        # Trace sampling only needs trace ids, so only kept rows are parsed.
+        batches = iter_data_batches(data_path, columns, normalize=False)
+        sample, rows_read = sample_by_trace(batches, max_rows)
+        sample = normalize_processed(sample)
+        return sample, SampleInfo(mode, rows_read, len(sample))
+    batches = iter_data_batches(data_path, columns)
+    sample, rows_read = sample_by_time(batches, max_rows, bucket)
+    return sample, SampleInfo(mode, rows_read, len(sample), bucket)
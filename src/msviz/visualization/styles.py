@@ -30,6 +30,15 @@ overall_stylesheet = [
             "height": 60,
         },
     },
+    {
+        "selector": ".anomaly",
+        "style": {
+            "line-color": "#FF4136",
+            "target-arrow-color": "#FF4136",
+            "line-style": "dashed",
+            "width": 5,
+        },
+    },
     {
         "selector": ".selected",
         "style": {
@@ -39,4 +48,31 @@ overall_stylesheet = [
             "color": "#000",
         },
     },
+    {
+        "selector": ".critical",
+        "style": {
+            "background-color": "#FF851B",
+            "line-color": "#FF851B",
+            "target-arrow-color": "#FF851B",
+            "width": 5,
+        },
+    },
+    {
+        "selector": ".added",
+        "style": {
+            "line-color": "#2ECC40",
+            "target-arrow-color": "#2ECC40",
+            "line-style": "dashed",
+            "width": 4,
+        },
+    },
+    {
+        "selector": ".removed",
+        "style": {
+            "line-color": "#AAAAAA",
+            "target-arrow-color": "#AAAAAA",
+            "line-style": "dotted",
+            "width": 4,
+        },
+    },
 ]
@@ -0,0 +1,200 @@
+"""Per-trace summaries and the server-side trace search behind the trace dropdown."""
+
+import numpy as np
+import pandas as pd
+
+ERROR_EVENT_PATTERN = r"error|exception|fail|fault|timeout"
+TRACE_PAGE_SIZE = 50
+SUMMARY_COLUMNS = [
+    "trace_id",
+    "start_time",
+    "end_time",
+    "duration_ms",
+    "critical_path_ms",
+    "span_count",
+    "call_count",
+    "services",
+    "error_calls",
+]
+
+
+def build_trace_summaries(data: pd.DataFrame) -> pd.DataFrame:
+    calls = data.dropna(subset=["trace_id"])
+    calls = calls.assign(
+        end_time=calls["timestamp"]
+        + pd.to_timedelta(calls["call_duration"].fillna(0), unit="ms"),
+        is_error=calls["event_code"]
+        .astype(str)
+        .str.contains(ERROR_EVENT_PATTERN, case=False, regex=True),
+    )
+
+    summaries = calls.groupby("trace_id", sort=False).agg(
+        start_time=("timestamp", "min"),
+        end_time=("end_time", "max"),
+        span_count=("transaction_id", "nunique"),
+        call_count=("timestamp", "size"),
+        error_calls=("is_error", "sum"),
+    )
+
+    services = (
+        pd.concat(
+            [
+                calls[["trace_id", "service_name"]].rename(
+                    columns={"service_name": "service"}
+                ),
+                calls[["trace_id", "callee"]].rename(columns={"callee": "service"}),
+            ]
+        )
+        .dropna()
+        .drop_duplicates()
+        .sort_values(["trace_id", "service"])
+        .groupby("trace_id", sort=False)["service"]
+        .agg(tuple)
+    )
+    if "critical_path" in calls:
+        # Calls on the critical path at the top of the call tree cover the
+        # whole critical path; nested ones are already inside them.
+        on_path = calls["critical_path"].astype(bool) & (calls["call_depth"] == 0)
+        critical_path_ms = (
+            calls["call_duration"].where(on_path, 0).groupby(calls["trace_id"]).sum()
+        )
+    else:
+        critical_path_ms = _in_flight_ms(calls)
+    summaries["critical_path_ms"] = critical_path_ms.reindex(summaries.index)
+    summaries["services"] = services.reindex(summaries.index).apply(
+        lambda value: value if isinstance(value, tuple) else ()
+    )
+    return finalize_trace_summaries(summaries.reset_index())
+
+
+def _in_flight_ms(calls: pd.DataFrame) -> pd.Series:
+    # Merge overlapping call intervals per trace: a call opens a new segment
+    # when it starts after every earlier call of its trace has returned. The
+    # summed segment lengths are the trace duration without idle gaps.
+    ordered = calls.sort_values(["trace_id", "timestamp"], kind="stable")
+    reach = ordered.groupby("trace_id", sort=False)["end_time"].cummax()
+    previous_reach = reach.groupby(ordered["trace_id"], sort=False).shift()
+    new_segment = previous_reach.isna() | (ordered["timestamp"] > previous_reach)
+    segments = ordered.groupby(new_segment.cumsum()).agg(
+        trace_id=("trace_id", "first"),
+        start=("timestamp", "min"),
+        end=("end_time", "max"),
+    )
+    lengths = (segments["end"] - segments["start"]).dt.total_seconds() * 1000
+    return lengths.groupby(segments["trace_id"], sort=False).sum()
+
+
+def finalize_trace_summaries(summaries: pd.DataFrame) -> pd.DataFrame:
+    summaries = summaries.assign(
+        duration_ms=(summaries["end_time"] - summaries["start_time"]).dt.total_seconds()
+        * 1000,
+        span_count=summaries["span_count"].astype(int),
+        call_count=summaries["call_count"].astype(int),
+        error_calls=summaries["error_calls"].fillna(0).astype(int),
+    )
+    return summaries[SUMMARY_COLUMNS]
+
+
+def format_trace_option(summary) -> dict:
+    trace_id = str(summary.trace_id)
+    short_id = f"{trace_id[:8]}..." if len(trace_id) > 8 else trace_id
+    label = (
+        f"{short_id}  {summary.duration_ms:.0f}ms, "
+        f"{summary.span_count} spans, {len(summary.services)} services"
+    )
+    if summary.error_calls:
+        label += f", {summary.error_calls} errors"
+    return {"label": label, "value": summary.trace_id, "search": trace_id}
+
+
+def trace_page_count(total: int) -> int:
+    return max(1, -(-total // TRACE_PAGE_SIZE))
+
+
+def describe_trace_page(page: int, total: int) -> str:
+    if not total:
+        return "No matching traces."
+    first = (page - 1) * TRACE_PAGE_SIZE + 1
+    last = min(page * TRACE_PAGE_SIZE, total)
+    return f"Traces {first}-{last} of {total}, slowest first"
+
+
+def build_trace_options(
+    trace_index, query=None, service=None, page=1, selected_trace_id=None
+) -> tuple[list, int]:
+    matches, total = trace_index.search(
+        query, service, limit=TRACE_PAGE_SIZE, offset=(page - 1) * TRACE_PAGE_SIZE
+    )
+    options = [
+        format_trace_option(summary) for summary in matches.itertuples(index=False)
+    ]
+    # The dropdown only displays a value that is present in its options.
+    if selected_trace_id is not None and not any(
+        option["value"] == selected_trace_id for option in options
+    ):
+        selected = trace_index.get(selected_trace_id)
+        if selected is not None:
+            options.insert(0, format_trace_option(selected))
+    return options, total
+
+
+class TraceIndex:
+    """Trace summaries sorted by duration with prefix and service lookups.
+
+    Prefix search is a binary search over the sorted trace ids and service
+    search a precomputed service -> trace mapping, so each keystroke in the
+    dropdown only touches the matching traces.
+    """
+
+    def __init__(self, summaries: pd.DataFrame):
+        self.summaries = summaries.sort_values(
+            ["duration_ms", "trace_id"], ascending=[False, True], kind="stable"
+        ).reset_index(drop=True)
+
+        trace_ids = self.summaries["trace_id"].astype(str).to_numpy()
+        self._id_order = np.argsort(trace_ids, kind="stable")
+        self._sorted_ids = trace_ids[self._id_order]
+        self._positions = pd.Series(
+            np.arange(len(trace_ids)), index=self.summaries["trace_id"]
+        )
+
+        exploded = self.summaries["services"].explode().dropna()
+        self._by_service = {
+            service: np.sort(positions.index.to_numpy())
+            for service, positions in exploded.groupby(exploded, sort=False)
+        }
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def get(self, trace_id):
+        position = self._positions.get(trace_id)
+        if position is None:
+            return None
+        return next(self.summaries.iloc[[position]].itertuples(index=False))
+
+    def search(
+        self,
+        query: str | None = None,
+        service: str | None = None,
+        limit: int = TRACE_PAGE_SIZE,
+        offset: int = 0,
+    ) -> tuple[pd.DataFrame, int]:
+        positions = None
+        if query:
+            lo = np.searchsorted(self._sorted_ids, query, side="left")
+            hi = np.searchsorted(self._sorted_ids, query + "\U0010ffff", side="left")
+            positions = np.sort(self._id_order[lo:hi])
+        if service:
+            by_service = self._by_service.get(service, np.array([], dtype=int))
+            positions = (
+                by_service
+                if positions is None
+                else np.intersect1d(positions, by_service, assume_unique=True)
+            )
+
+        if positions is None:
+            return self.summaries.iloc[offset : offset + limit], len(self.summaries)
+        # Positions are ranks in the duration-sorted table, so sorting them
+        # keeps the slowest traces first.
+        return self.summaries.iloc[positions[offset : offset + limit]], len(positions)